@@ -1,12 +1,34 @@
 import tkinter as tk
 from tkinter import filedialog, simpledialog, ttk, font
+import argparse
+import array
+import ast
+import bisect
+import collections
+import concurrent.futures
+import contextlib
+import difflib
+import errno
+import gc
+import itertools
 import json
+import multiprocessing
+import os
 import re
+import socket
+import stat
+import sys
+import tempfile
+import time
+import tracemalloc
 
 class TextWithLineNumbers(tk.Frame):
+    open_editors = []  # every live editor, so completion can draw on other open files
+    memory_job = None  # one memory budget check per process, whichever window is open
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-
+        TextWithLineNumbers.open_editors.append(self)
 
         self.light_mode = {
             'bg': '#FFFFFF',
@@ -31,6 +53,21 @@ class TextWithLineNumbers(tk.Frame):
         self.filename = None
         self.default_font_size = 10  # Default font size initialization
         self.sticky_indentation = tk.IntVar(value=1)  # Default: on
+        self.show_outline_var = tk.BooleanVar(value=False)  # outline panel is OFF
+        self.show_minimap_var = tk.BooleanVar(value=True)  # minimap is ON
+        self.symbol_idle_ms = 750  # quiet time before the symbol index is rebuilt
+        self.autocomplete_var = tk.BooleanVar(value=True)  # word completion is ON
+        self.readonly_var = tk.BooleanVar(value=False)  # buffer is editable
+        self.long_line_protection = tk.BooleanVar(value=True)  # cut off very long lines on load
+        self.long_line_limit = 10000  # characters of a long line that are laid out before it is cut off
+        self.protected_lines = 0
+        self.undo_budget_mb = 16  # memory the undo/redo history may hold before old entries are dropped
+        self.memory_budget_mb = 512  # estimated memory of all open documents before caches are released
+        self.memory_check_ms = 30000
+        self.caches_released = False  # drop_caches() ran and restore_caches() has not yet
+        self.multi_cursors = []  # [(start, end)] as (line, col) pairs while several cursors are active
+        self._multi_editing = False
+        self._column_anchor = None
 
         self.my_font = "Courier New"
         if not self.is_font_available(self.my_font):
@@ -43,25 +80,54 @@ class TextWithLineNumbers(tk.Frame):
         # Set the title for your main window
         self.master.title("Simple Programmers Editor")
 
-        # Line Numbers (left side)
-        self.line_numbers = tk.Text(self, width=4)
-        self.line_numbers.grid(row=0, column=0, rowspan=2, sticky="ns")
-
-        # Main Text Editor
+        # Main Text Editor - undo is handled by UndoHistory, not Tk's own snapshot-free undo stack
         self.text = tk.Text(self, wrap=tk.WORD)
+        self.undo_history = UndoHistory(self.undo_budget_mb * 1024 * 1024)
         self.text.grid(row=0, column=1, sticky="nsew")
 
+        # Line Numbers (left side) - only the visible lines are drawn
+        self.change_tracker = ChangeTracker(hash_chars=self.long_line_limit)  # buffer lines against the last loaded/saved version
+        self._change_job = None
+        self.line_numbers = LineGutter(self, self.text, change_tracker=self.change_tracker)
+        self.line_numbers.grid(row=0, column=0, rowspan=2, sticky="ns")
+
         # Vertical Scrollbar (right side)
         self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self._yview_both)
-        self.text.config(yscrollcommand=self.scrollbar.set)
+        self.text.config(yscrollcommand=self._text_yscroll)
         self.scrollbar.grid(row=0, column=2, sticky="ns")
 
+        # Minimap (beside the scrollbar) - per-line lengths and indents, downsampled to its height
+        self.minimap = Minimap(self, self.text, tab_width=self.tab_spaces)
+        self.minimap.grid(row=0, column=3, rowspan=2, sticky="ns")
+
+        # Split View (second pane on the same buffer, created on demand)
+        self.split_view_var = tk.BooleanVar(value=False)
+        self.split_pane = None
+        self.split_text = None
+        self.split_gutter = None
+
         # Horizontal Scrollbar
         self.h_scrollbar = tk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.text.xview)
         self.text.config(xscrollcommand=self.h_scrollbar.set)
         self.h_scrollbar.grid(row=1, column=1, sticky="ew")
         self.h_scrollbar.grid_remove()  # Initially, hide it as word wrap is ON
 
+        # Symbol Outline (far right, hidden until enabled)
+        self.symbol_indexer = SymbolIndexer()
+        self._symbols = []  # (mark, depth, kind, name) in line order
+        self._symbol_job = None
+        self._symbol_poll_job = None
+        self._symbol_generation = 0
+        self.outline_panel = tk.Listbox(self, width=28, activestyle="none", exportselection=False)
+        self.outline_panel.grid(row=0, column=4, rowspan=2, sticky="ns")
+        self.outline_panel.grid_remove()
+
+        # Word completion (index kept in step with every edit, popup created on first use)
+        self.word_index = WordIndex()
+        self.completion_popup = None
+        self.completion_list = None
+        self._completion_prefix = ""
+
         # Status Bar
         self.status_bar = tk.Frame(self)
         self.status_label_left = tk.Label(self.status_bar, anchor="w")
@@ -69,7 +135,7 @@ class TextWithLineNumbers(tk.Frame):
 
         self.status_label_left.pack(side=tk.LEFT, fill=tk.X, expand=True)
         self.status_label_right.pack(side=tk.RIGHT)
-        self.status_bar.grid(row=2, column=0, columnspan=3, sticky="ew")
+        self.status_bar.grid(row=3, column=0, columnspan=5, sticky="ew")
 
         self.update_status_bar()  # Initialize with default values
         self.apply_font_attributes() #apply the font attributes set in defaults
@@ -84,12 +150,30 @@ class TextWithLineNumbers(tk.Frame):
         self.text.bind('<Button-4>', self._on_text_scroll)  # For Linux, bind button-4 and button-5 to handle mouse scrolling
         self.text.bind('<Button-5>', self._on_text_scroll)
         self.line_numbers.bind("<FocusIn>", self._redirect_focus)
+        self.text.bind('<FocusIn>', self.restore_caches)
         self.text.bind('<Tab>', self.handle_tab)
         self.text.bind('<Return>', self.handle_enter)
         self.text.bind('<Configure>', self.sync_line_numbers_view)
+        self.text.bind('<Up>', self._completion_up)
+        self.text.bind('<Down>', self._completion_down)
+        self.text.bind('<Escape>', self._escape)
+        self.text.bind('<Control-z>', self.undo)
+        self.text.bind('<Control-y>', self.redo)
+        self.text.bind('<Control-Z>', self.redo)  # Control-Shift-z
+        self.text.bind('<KeyPress>', self._multi_cursor_key)
+        self.text.bind('<Control-Button-1>', self._add_cursor_click)
+        self.text.bind('<Alt-Button-1>', self._column_select_start)
+        self.text.bind('<Alt-B1-Motion>', self._column_select_drag)
+        self.outline_panel.bind('<<ListboxSelect>>', self._outline_select)
+        self.bind('<Destroy>', self._on_destroy)
+        self._edit_callbacks = (self.register(self._edit_recording), self.register(self._edit_done))
+        self._install_edit_hook(self.text)
 
         self.new_file()
         self.toggle_dark_mode()
+        if TextWithLineNumbers.memory_job is None:
+            root = self._root()
+            TextWithLineNumbers.memory_job = root.after(self.memory_check_ms, TextWithLineNumbers.check_memory_budget, root)
 
         # Adjusting row and column weights for resizing behavior
         self.grid_rowconfigure(0, weight=1)  # main row containing text widget and vertical scrollbar
@@ -103,6 +187,7 @@ class TextWithLineNumbers(tk.Frame):
         self.sync_line_numbers_view()
         if self.show_indentation_var.get():
             self.display_indentation()
+        self._schedule_completion(event)
 
     def _modified(self, event=None):
         self._on_text_modified()
@@ -110,10 +195,117 @@ class TextWithLineNumbers(tk.Frame):
     def _button_release_1(self, event=None):
         self.update_status_bar()
         self.remove_highlight()
+        self.hide_completion()
+        if event is None or not event.state & (0x0004 | 0x0008 | 0x20000):  # Control / Alt clicks add cursors
+            self.clear_multi_cursors()
+
+    def _escape(self, event=None):
+        if self.multi_cursors:
+            self.clear_multi_cursors()
+            return "break"
+        return self.hide_completion()
 
     def _redirect_focus(self, event):
         self.text.focus_set()
 
+    def _text_edited(self, first_line, old_last_line, new_last_line):
+        # Called after every insert/delete on self.text with the line span it touched
+        if self.multi_cursors and not self._multi_editing:
+            self.clear_multi_cursors()  # the buffer changed under the extra cursors
+        if self.protected_lines:
+            changed_text = self._get_lines_unprotected(first_line, new_last_line)
+        else:
+            changed_text = self.text.get(f"{first_line}.0", f"{new_last_line}.end")
+        self.word_index.update_lines(first_line, old_last_line, changed_text)
+        self.change_tracker.update_lines(first_line, old_last_line, changed_text)
+        self.minimap.update_lines(first_line, old_last_line, changed_text)
+        self.schedule_change_markers()
+        self.schedule_symbol_index()
+        self.sync_line_numbers_view()
+
+    def _get_lines_unprotected(self, first_line, last_line):
+        # Like get(first.0, last.end), but a protected line is only read up to long_line_limit,
+        # so a keystroke never copies a whole protected line
+        pieces, line = [], first_line
+        while line <= last_line:
+            hidden = self.text.tag_nextrange("longline", f"{line}.0", f"{last_line}.end")
+            if not hidden:
+                break
+            protected = int(hidden[0].split('.')[0])
+            pieces.append(self.text.get(f"{line}.0", f"{protected}.{self.long_line_limit}"))
+            line = protected + 1
+        if line <= last_line:
+            pieces.append(self.text.get(f"{line}.0", f"{last_line}.end"))
+        return "\n".join(pieces)
+
+    def _on_destroy(self, event):
+        if event.widget is self and self in TextWithLineNumbers.open_editors:
+            TextWithLineNumbers.open_editors.remove(self)
+            # Tk has already destroyed the widgets; drop what still points back at this editor
+            for job in (self._symbol_job, self._symbol_poll_job, self._change_job):
+                if job is not None:
+                    self.after_cancel(job)
+            self.symbol_indexer.close()
+            proxies = [self.text._w] + ([self.split_text._w] if self.split_text is not None else [])
+            for command in proxies + list(self._edit_callbacks):
+                self.deletecommand(command)
+
+
+    #Edit tracking ----------------------------------------------------
+    # Tcl proc that stands in for a text widget's command. It runs the real command with normal Tcl error
+    # semantics, so Tk's own "catch {$w index sel.first}" style bindings behave as usual, and only reports
+    # inserts, deletes and replaces that went through; a disabled widget ignores them, so those are not reported.
+    # ORIGINAL, RECORDING and EDITED are filled in per widget.
+    _edit_proxy = """
+        set op [lindex $args 0]
+        if {$op ni {insert delete replace} || [llength $args] < 2 || [ORIGINAL cget -state] ne "normal"} {
+            return [ORIGINAL {*}$args]
+        }
+        set start [ORIGINAL index [lindex $args 1]]
+        set chars {}
+        if {$op eq "insert"} {
+            set end $start
+            set chars [lrange $args 2 end]
+        } elseif {[llength $args] > 2} {
+            set end [ORIGINAL index [lindex $args 2]]
+            if {$op eq "replace"} {set chars [lrange $args 3 end]}
+        } else {
+            set end [ORIGINAL index "$start+1c"]
+        }
+        # Tk never touches the final newline, so clamp both ends to the last real character
+        set last [ORIGINAL index end-1c]
+        if {[ORIGINAL compare $start > $last]} {set start $last}
+        if {[ORIGINAL compare $end > $last]} {set end $last}
+        set deleted {}
+        if {$end ne $start && [RECORDING]} {set deleted [ORIGINAL get $start $end]}
+        set result [ORIGINAL {*}$args]
+        set inserted {}
+        foreach {text tags} $chars {append inserted $text}
+        EDITED $start $end $deleted $inserted
+        return $result
+    """
+
+    def _install_edit_hook(self, widget):
+        # Rename the widget's Tcl command and put a proc in front of it so edits can be observed
+        original = widget._w + "_orig"
+        recording, edited = self._edit_callbacks
+        body = self._edit_proxy.replace("ORIGINAL", original).replace("RECORDING", recording).replace("EDITED", edited)
+        self.tk.call("rename", widget._w, original)
+        self.tk.call("proc", widget._w, "args", body)
+
+    def _edit_recording(self):
+        return int(self.undo_history.recording())
+
+    def _edit_done(self, start, end, deleted, inserted):
+        first_line, first_col = map(int, start.split('.'))
+        if self._edit_recording():
+            if self.show_indentation_var.get():
+                # record the real text: undo may run after the markers have been hidden again
+                self.undo_history.record((first_line, first_col), unmark_indentation(deleted), unmark_indentation(inserted))
+            else:
+                self.undo_history.record((first_line, first_col), deleted, inserted)
+        self._text_edited(first_line, int(end.split('.')[0]), first_line + inserted.count("\n"))
+
 
     #Menus ----------------------------------------------------
     def create_menus(self):
@@ -134,12 +326,24 @@ class TextWithLineNumbers(tk.Frame):
 
         # Create the Edit menu with its items
         self.edit_menu = tk.Menu(self.menu_bar, tearoff=0)
+        self.edit_menu.add_command(label="Undo", command=self.undo)
+        self.edit_menu.add_command(label="Redo", command=self.redo)
+        self.edit_menu.add_command(label="Undo History Size", command=self.show_undo_history_size)
+        self.edit_menu.add_separator()  # Add a separator
         self.edit_menu.add_command(label="Copy", command=self.copy_text)
         self.edit_menu.add_command(label="Cut", command=self.cut_text)
         self.edit_menu.add_command(label="Paste", command=self.paste_text)
         self.edit_menu.add_separator()  # Add a separator
         self.edit_menu.add_command(label="Find", command=self.open_search_dialog)
         self.edit_menu.add_command(label="Find/Replace", command=self.open_replace_dialog)
+        self.edit_menu.add_command(label="Go to Symbol...", command=self.open_goto_symbol_dialog)
+        self.edit_menu.add_command(label="Cursor on Each Selected Line", command=self.cursors_from_selection)
+        self.edit_menu.add_command(label="Next Change", command=self.goto_next_change)
+        self.edit_menu.add_command(label="Previous Change", command=self.goto_previous_change)
+        self.edit_menu.add_separator()  # Add a separator
+        self.edit_menu.add_command(label="Trim Trailing Whitespace", command=lambda: self.apply_transform(trim_trailing_whitespace))
+        self.edit_menu.add_command(label="Indentation to Spaces", command=lambda: self.apply_transform(convert_indentation, self.tab_spaces, True))
+        self.edit_menu.add_command(label="Indentation to Tabs", command=lambda: self.apply_transform(convert_indentation, self.tab_spaces, False))
         self.menu_bar.add_cascade(label="Edit", menu=self.edit_menu)
 
         # Create the 'Options' menu
@@ -153,7 +357,15 @@ class TextWithLineNumbers(tk.Frame):
         self.options_menu.add_checkbutton(label="Spaces for Tab", variable=self.use_spaces_for_tab)
         self.options_menu.add_checkbutton(label="Sticky Indentation", variable=self.sticky_indentation)
         self.options_menu.add_checkbutton(label="Show Indentation", variable=self.show_indentation_var, command=self.toggle_indentation_display)
+        self.options_menu.add_checkbutton(label="Show Outline", variable=self.show_outline_var, command=self.toggle_outline_panel)
+        self.options_menu.add_checkbutton(label="Show Minimap", variable=self.show_minimap_var, command=self.toggle_minimap)
+        self.options_menu.add_checkbutton(label="Split View", variable=self.split_view_var, command=self.toggle_split_view)
+        self.options_menu.add_checkbutton(label="Protect Long Lines", variable=self.long_line_protection, command=self.toggle_long_line_protection)
+        self.options_menu.add_command(label="Expand Long Line", command=self.expand_long_line)
+        self.options_menu.add_checkbutton(label="Word Completion", variable=self.autocomplete_var, command=self.hide_completion)
+        self.options_menu.add_checkbutton(label="Read Only", variable=self.readonly_var, command=self.toggle_readonly)
         self.options_menu.add_separator()  # Add a separator
+        self.options_menu.add_command(label="Memory Report", command=self.open_memory_report)
         self.options_menu.add_command(label="Settings", command=self.open_settings)
         self.menu_bar.add_cascade(label="Options", menu=self.options_menu)
 
@@ -166,7 +378,13 @@ class TextWithLineNumbers(tk.Frame):
                 return
             if save_changes:
                 self.save_file()
-        self.text.delete(1.0, tk.END)
+        self.text.config(state=tk.NORMAL)  # a read only buffer still has to be cleared
+        with self.undo_history.paused():
+            self.text.delete(1.0, tk.END)
+        self.toggle_readonly()
+        self.undo_history.clear()
+        self.protected_lines = 0
+        self.change_tracker.reset("")
         self.text.mark_set(tk.INSERT, "1.0")  # Set the cursor to line 1, column 1 after loading the file
         self.text.focus_set()  # Set focus to the text widget
         self.filename = None
@@ -179,9 +397,20 @@ class TextWithLineNumbers(tk.Frame):
         filepath = filedialog.askopenfilename()
         if not filepath:
             return
-        self.text.delete(1.0, tk.END)
+        self.load_file(filepath)
+
+
+    def load_file(self, filepath):
+        self.text.config(state=tk.NORMAL)  # a read only buffer still has to take the new file
         with open(filepath, "r") as file:
-            self.text.insert(1.0, file.read())
+            content = file.read()
+        with self.undo_history.paused():
+            self.text.delete(1.0, tk.END)
+            self.text.insert(1.0, content)
+        self.undo_history.clear()
+        self.change_tracker.reset(content)
+        self.protect_long_lines(content)  # before Tk gets an idle moment to lay the text out
+        self.toggle_readonly()
         self.text.mark_set(tk.INSERT, "1.0")  # Set the cursor to line 1, column 1 after loading the file
         self.text.focus_set()  # Set focus to the text widget
         self.filename = filepath
@@ -190,6 +419,42 @@ class TextWithLineNumbers(tk.Frame):
         self.update_status_bar()
 
 
+    def open_requested_files(self, files, readonly=False):
+        # Open files handed over by another launch; each gets its own window unless this one is still empty
+        if not files:
+            self.winfo_toplevel().deiconify()
+            self.winfo_toplevel().lift()
+        for filepath, line, col in files:
+            editor = next((e for e in TextWithLineNumbers.open_editors if e.filename == filepath), None)
+            if editor is None:
+                if self.filename is None and not self.text.edit_modified() and self.text.compare("end-1c", "==", "1.0"):
+                    editor = self
+                else:
+                    editor = TextWithLineNumbers.new_window(self.winfo_toplevel())
+                editor.readonly_var.set(readonly or editor.readonly_var.get())
+                try:
+                    editor.load_file(filepath)
+                except OSError as e:
+                    tk.messagebox.showerror("Open File", str(e))
+                    continue
+            if line:
+                editor.goto_line(line, col - 1 if col else 0)
+            window = editor.winfo_toplevel()
+            window.deiconify()
+            window.lift()
+            editor.text.focus_force()
+
+
+    @classmethod
+    def new_window(cls, root):
+        window = tk.Toplevel(root)
+        editor = cls(window)
+        editor.create_menus()
+        editor.pack(fill=tk.BOTH, expand=True)
+        editor.toggle_word_wrap()
+        return editor
+
+
     def save_file(self):
         if self.filename:
             if self.show_indentation_var.get():
@@ -199,6 +464,8 @@ class TextWithLineNumbers(tk.Frame):
                 file.write(self.text.get(1.0, tk.END))
                 self.text.edit_modified(False)
                 self._on_text_modified()
+            self.change_tracker.reset(self.text.get("1.0", "end-1c"))
+            self._update_line_numbers()  # clear the change markers
             if self.show_indentation_var.get():
                 #indentation is still enabled - display it again
                 self.display_indentation()
@@ -215,6 +482,8 @@ class TextWithLineNumbers(tk.Frame):
             self.hide_indentation()
         with open(filepath, "w") as file:
             file.write(self.text.get(1.0, tk.END))
+        self.change_tracker.reset(self.text.get("1.0", "end-1c"))
+        self._update_line_numbers()  # clear the change markers
         self.filename = filepath
         self.text.edit_modified(False)
         self._on_text_modified()
@@ -231,7 +500,13 @@ class TextWithLineNumbers(tk.Frame):
                 return
             if save_changes:
                 self.save_file()
-        self.text.delete(1.0, tk.END)
+        self.text.config(state=tk.NORMAL)  # a read only buffer still has to be cleared
+        with self.undo_history.paused():
+            self.text.delete(1.0, tk.END)
+        self.toggle_readonly()
+        self.undo_history.clear()
+        self.protected_lines = 0
+        self.change_tracker.reset("")
         self.filename = None
         self._update_line_numbers()  # Refresh line numbers
         self.text.edit_modified(False)
@@ -240,13 +515,16 @@ class TextWithLineNumbers(tk.Frame):
 
 
     def exit_editor(self):
-        if self.text.edit_modified():
-            answer = tk.messagebox.askyesnocancel("Save Changes", "Do you want to save changes before exiting?")
-            if answer:
-                self.save_file()
-            elif answer is None:  # Cancel was selected
-                return
-        root.destroy()
+        # Exit closes every window, including those opened by later launches, so ask about each unsaved one
+        for editor in list(TextWithLineNumbers.open_editors):
+            if editor.text.edit_modified():
+                editor.winfo_toplevel().lift()
+                answer = tk.messagebox.askyesnocancel("Save Changes", f"Do you want to save changes to {editor.filename or 'Unnamed'} before exiting?", parent=editor)
+                if answer:
+                    editor.save_file()
+                elif answer is None:  # Cancel was selected
+                    return
+        self._root().destroy()
 
 
     # Cut / Copy / Paste functions ---------------------------------------
@@ -273,6 +551,9 @@ class TextWithLineNumbers(tk.Frame):
         """Paste the text currently in the clipboard."""
         try:
             clipboard_text = self.master.clipboard_get()
+            if self.multi_cursors:
+                self.multi_cursor_edit("paste", clipboard_text)
+                return
             self.text.insert(tk.INSERT, clipboard_text)
         except tk.TclError:
             pass  # No text in clipboard or some other error
@@ -283,8 +564,7 @@ class TextWithLineNumbers(tk.Frame):
         # Calculate the scroll amount
         scroll_amount = -1*(event.delta//120)
 
-        # Scroll both text widget and line numbers
-        self.line_numbers.yview("scroll", scroll_amount, "units")
+        # Scroll the text widget - the line numbers follow through _text_yscroll
         self.text.yview("scroll", scroll_amount, "units")
 
         # Get the line number of the first visible line in the Text widget
@@ -298,18 +578,29 @@ class TextWithLineNumbers(tk.Frame):
 
 
     def _yview_both(self, *args):
-        # Synchronize yview for both main text and line numbers text
+        # Scrollbar command - the line numbers follow through _text_yscroll
         self.text.yview(*args)
-        self.line_numbers.yview(*args)
+
+
+    def _text_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.line_numbers.schedule_redraw()
+        self.minimap.show_view(first, last)
 
 
     #Manage sticky indentation ---------------------------------------
     def handle_enter(self, event):
+        if self.multi_cursors:
+            return self._multi_cursor_key(event)
+        if self.completion_visible():
+            self.accept_completion()
+            return "break"
         if self.sticky_indentation.get():
+            text = event.widget  # the main text or the split view pane
             # Get the current line number
-            line, _ = self.text.index(tk.INSERT).split('.')
+            line, _ = text.index(tk.INSERT).split('.')
             # Get the content of the current line before the insertion point
-            current_line_content = self.text.get(f"{line}.0", tk.INSERT)
+            current_line_content = text.get(f"{line}.0", tk.INSERT)
             # Find the white spaces (tabs or spaces) at the beginning of the line
             indentation = ""
             for char in current_line_content:
@@ -318,13 +609,17 @@ class TextWithLineNumbers(tk.Frame):
                 else:
                     break
             # Insert the same indentation to the new line after the insertion point
-            self.text.insert(tk.INSERT, "\n" + indentation)
+            text.insert(tk.INSERT, "\n" + indentation)
             return "break"  # This prevents the default behavior
         return None  # This allows the normal Enter behavior if the option is not checked
 
 
     #indentation display ----------------------------------------
     def toggle_indentation_display(self):
+        if self.show_indentation_var.get() and self.protected_lines:
+            self.show_indentation_var.set(False)
+            tk.messagebox.showinfo("Show Indentation", "Indentation display is off while long lines are protected.")
+            return
         if self.show_indentation_var.get():
             self.display_indentation()
         else:
@@ -332,25 +627,20 @@ class TextWithLineNumbers(tk.Frame):
 
 
     def display_indentation(self):
+        if self.protected_lines:
+            return  # a whole-buffer rewrite would lay the protected lines out in full
         cursor_position = self.text.index(tk.INSERT)  # Save cursor position
         top_line = int(self.text.index("@0,0").split('.')[0])
-        self.original_content = self.text.get("1.0", "end-1c")
+        original_content = self.text.get("1.0", "end-1c")  # local, so no second copy outlives the call
 
         # Replace every 'self.tab_spaces' spaces with '    ·'
-        replacement = ' '*(self.tab_spaces-1)
-        replacement += '¦'
-        indent_space_pattern = re.compile(' ' * self.tab_spaces)
-        content_with_indentation = indent_space_pattern.sub(replacement, self.original_content)
+        content_with_indentation = mark_indentation(original_content, self.tab_spaces)
 
-        self.text.delete("1.0", tk.END)
-        self.text.insert("1.0", content_with_indentation)
+        self._rewrite_indentation(content_with_indentation)
         self._update_line_numbers()  # Refresh line numbers
 
-        # Scroll until the original cursor position comes into view
-        self.text.mark_set(tk.INSERT, cursor_position)  # Restore cursor position temporarily for the loop
-        while top_line != int(self.text.index("@0,0").split('.')[0]):  # While cursor is not visible, keep scrolling
-            self.text.yview_scroll(1, tk.UNITS)
-            self.line_numbers.yview_scroll(1, tk.UNITS)
+        # Bring the original cursor position and top line back into view
+        self.restore_view(cursor_position, top_line)
 
 
 
@@ -361,25 +651,47 @@ class TextWithLineNumbers(tk.Frame):
 
         # Get the current content and replace the indentation markers
         content = self.text.get(1.0, tk.END)
-        updated_content = content.replace("¦", " ")
+        updated_content = unmark_indentation(content)
 
         # Update the content in the text widget
-        self.text.delete(1.0, tk.END)
-        self.text.insert(1.0, updated_content[:-1])
+        self._rewrite_indentation(updated_content[:-1])
         self._update_line_numbers()  # Refresh line numbers
 
-        # Scroll until the original cursor position comes into view
-        self.text.mark_set(tk.INSERT, cursor_position)  # Restore cursor position temporarily for the loop
-        while top_line != int(self.text.index("@0,0").split('.')[0]):  # While cursor is not visible, keep scrolling
-            self.text.yview_scroll(1, tk.UNITS)
-            self.line_numbers.yview_scroll(1, tk.UNITS)
+        # Bring the original cursor position and top line back into view
+        self.restore_view(cursor_position, top_line)
 
 
 
+    def _rewrite_indentation(self, content):
+        # Display only - the markers are the same length as the spaces, so this is no edit to undo, and it
+        # has to reach a read only buffer too or the markers would end up in the saved file
+        state = self.text.cget("state")
+        self.text.config(state=tk.NORMAL)
+        self._multi_editing = True  # the text keeps its shape, so extra cursors stay where they are
+        try:
+            with self.undo_history.paused():
+                self.text.delete("1.0", tk.END)
+                self.text.insert("1.0", content)
+        finally:
+            self._multi_editing = False
+            self.text.config(state=state)
+        if self.multi_cursors:
+            self._show_multi_cursors()  # the rewrite dropped their tags
+
+
+
+    def restore_view(self, cursor_position, top_line):
+        # Put the cursor back and scroll straight to top_line in a single step
+        self.text.mark_set(tk.INSERT, cursor_position)
+        self.text.yview(f"{top_line}.0")
+        self.sync_line_numbers_view()
+
+
     def sync_line_numbers_view(self, event=None):
         # Synchronize the line numbers view with the text widget
-        top_fraction, _ = self.text.yview()
-        self.line_numbers.yview_moveto(top_fraction)
+        self.line_numbers.schedule_redraw()
+        if self.split_gutter is not None:
+            self.split_gutter.schedule_redraw()
 
 
     #Manage Wordwrap --------------------------------------------------
@@ -390,35 +702,847 @@ class TextWithLineNumbers(tk.Frame):
             top_line = int(self.text.index("@0,0").split('.')[0])
             #Enable Wordwrap at the word
             self.text.config(wrap=tk.WORD)  # Change to tk.CHAR if you prefer to wrap at character
+            if self.split_text is not None:
+                self.split_text.config(wrap=tk.WORD)
             self.h_scrollbar.grid_remove()  # Hide the horizontal scrollbar
             self.text.mark_set(tk.INSERT, 1.0)
             self._update_line_numbers()
             #Now reposition the view
-            self.text.mark_set(tk.INSERT, cursor_position)  # Restore cursor position temporarily for the loop
-            while top_line != int(self.text.index("@0,0").split('.')[0]):  # While cursor is not visible, keep scrolling
-                self.text.yview_scroll(1, tk.UNITS)
-                self.line_numbers.yview_scroll(1, tk.UNITS)
+            self.restore_view(cursor_position, top_line)
         else:
             #prepare to return to this view - get cursor position and top line.
             cursor_position = self.text.index(tk.INSERT)  # Save cursor position
             top_line = int(self.text.index("@0,0").split('.')[0])
             #Disable Wordwrap
             self.text.config(wrap=tk.NONE)
+            if self.split_text is not None:
+                self.split_text.config(wrap=tk.NONE)
             self.h_scrollbar.grid()  # Show the horizontal scrollbar
             self.text.grid_rowconfigure(1, weight=1)  # Ensure the scrollbar occupies its space fully
             self.text.mark_set(tk.INSERT, 1.0)
             self._update_line_numbers()
             #Now reposition the view
-            self.text.mark_set(tk.INSERT, cursor_position)  # Restore cursor position temporarily for the loop
-            while top_line != int(self.text.index("@0,0").split('.')[0]):  # While cursor is not visible, keep scrolling
-                self.text.yview_scroll(1, tk.UNITS)
-                self.line_numbers.yview_scroll(1, tk.UNITS)
+            self.restore_view(cursor_position, top_line)
+
+
+    #Undo / Redo ------------------------------------------------------
+    def undo(self, event=None):
+        self._apply_history_change(None if self.readonly_var.get() else self.undo_history.undo(), event)
+        return "break"
+
+
+    def redo(self, event=None):
+        self._apply_history_change(None if self.readonly_var.get() else self.undo_history.redo(), event)
+        return "break"
+
+
+    def _apply_history_change(self, change, event=None):
+        # change is (position, text to remove, text to put back) from UndoHistory; the cursor moves in the
+        # pane the key was pressed in
+        if change is None:
+            self.bell()
+            return
+        (line, col), removed, added = change
+        start = f"{line}.{col}"
+        with self.undo_history.paused():
+            self.text.replace(start, f"{start}+{len(removed)}c", added)
+        pane = event.widget if event is not None else self.text
+        pane.mark_set(tk.INSERT, f"{start}+{len(added)}c")
+        pane.see(tk.INSERT)
+        self._update_line_numbers()
+        self.update_status_bar()
+
+
+    def show_undo_history_size(self):
+        undo_count, redo_count, size = self.undo_history.memory_use()
+        tk.messagebox.showinfo("Undo History",
+                               f"Undo steps: {undo_count}\nRedo steps: {redo_count}\n"
+                               f"Memory: {size / 1024:.1f} KB of {self.undo_history.budget / 1024 / 1024:.0f} MB")
+
+
+    #Memory accounting ------------------------------------------------
+    rebuildable = ("word index", "minimap", "symbol outline")  # caches drop_caches() can let go of
+
+    def memory_estimate(self):
+        # Approximate bytes per subsystem of this document
+        return {
+            "buffer (Tk)": int(self.tk.call(self.text._w, "count", "-chars", "1.0", "end-1c")),
+            "undo history": self.undo_history.memory_use()[2],
+            "word index": self.word_index.memory_use(),
+            "change markers": self.change_tracker.memory_use(),
+            "minimap": self.minimap.memory_use(),
+            "symbol outline": sys.getsizeof(self._symbols) + sum(map(sys.getsizeof, self._symbols)),
+        }
+
+
+    def memory_report(self):
+        # memory_estimate() plus the Tk-side counts behind it
+        subsystems = self.memory_estimate()
+        tags = self.text.tag_names()
+        tk_counts = {
+            "chars": subsystems["buffer (Tk)"],
+            "lines": int(self.text.index("end-1c").split('.')[0]),
+            "tags": len(tags),
+            "tag ranges": sum(len(self.text.tag_ranges(tag)) // 2 for tag in tags),
+            "marks": len(self.text.mark_names()),
+            "gutter items": len(self.line_numbers.find_all()),
+        }
+        return self.filename or "Unnamed", subsystems, tk_counts
+
+
+    @classmethod
+    def check_memory_budget(cls, root):
+        # Runs once per process for all editors. When the documents together are over budget, memory is given
+        # back until the total is at three quarters of it: first the rebuildable caches of background documents,
+        # then the oldest undo steps of the largest histories, only as many as needed. Buffers cannot be
+        # released, so when they alone fill the target the undo histories are left alone rather than trimmed
+        # again on every check.
+        if not cls.open_editors:
+            cls.memory_job = None
+            return
+        budget = cls.open_editors[0].memory_budget_mb * 1024 * 1024
+        cls.memory_job = root.after(cls.open_editors[0].memory_check_ms, cls.check_memory_budget, root)
+        estimates = {editor: editor.memory_estimate() for editor in cls.open_editors}
+        total = sum(sum(estimate.values()) for estimate in estimates.values())
+        if total <= budget:
+            return
+        target = budget * 3 // 4
+        focus = str(root.tk.call("focus"))
+        released = []
+        for editor, estimate in estimates.items():
+            if total > target and not focus.startswith(editor._w + "."):
+                editor.drop_caches()
+                total -= sum(estimate[name] for name in cls.rebuildable)
+                released.append(editor)
+        if sum(estimate["buffer (Tk)"] for estimate in estimates.values()) <= target:
+            for editor in sorted(estimates, key=lambda e: estimates[e]["undo history"], reverse=True):
+                undo = estimates[editor]["undo history"]
+                if total <= target or not undo:
+                    break
+                editor.release_memory(undo_fraction=max(1 - (total - target) / undo, 0.0))
+                total -= undo - editor.memory_estimate()["undo history"]
+                released.append(editor)
+        for editor in released:
+            editor.status_label_left.config(text="Memory budget exceeded - released undo history and caches")
+
+
+    def release_memory(self, drop_caches=False, undo_fraction=0.5):
+        # Give back what can be rebuilt or lived without: the older part of the undo history,
+        # stale highlight tags, the completion popup and, for documents in the background, the caches
+        self.undo_history.shrink(undo_fraction)
+        self.remove_highlight()
+        if not self.multi_cursors:
+            self.text.tag_remove("multicursor", "1.0", tk.END)
+            self.text.tag_remove("multiselect", "1.0", tk.END)
+        if self.completion_popup is not None:
+            self.completion_popup.destroy()
+            self.completion_popup = self.completion_list = None
+        if drop_caches:
+            self.drop_caches()
+        gc.collect()
+
+
+    def drop_caches(self):
+        # Word index, minimap lines and symbol marks all come back from the buffer in restore_caches()
+        self.word_index = WordIndex()
+        self.minimap.clear()
+        self._symbol_generation += 1  # a parse in flight belongs to the dropped outline
+        self._apply_symbols([])
+        self.caches_released = True
+
+
+    def restore_caches(self, event=None):
+        # Bound to FocusIn: rebuild what drop_caches() let go of once the document is used again
+        if not self.caches_released:
+            return
+        self.caches_released = False
+        content = self._get_lines_unprotected(1, int(self.text.index("end-1c").split('.')[0]))
+        self.word_index = WordIndex()
+        self.word_index.update_lines(1, 1, content)
+        self.minimap.clear()
+        self.minimap.update_lines(1, 1, content)
+        self.schedule_symbol_index()
+
+
+    def open_memory_report(self):
+        report_window = tk.Toplevel(self)
+        report_window.title("Memory Report")
+
+        report_text = tk.Text(report_window, width=72, height=30)
+        report_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        def kilobytes(size):
+            return f"{size / 1024:>12,.1f} KB"
+
+        def refresh():
+            lines, total = [], 0
+            for editor in TextWithLineNumbers.open_editors:
+                document, subsystems, tk_counts = editor.memory_report()
+                total += sum(subsystems.values())
+                lines.append(f"Document: {document}")
+                for name, size in subsystems.items():
+                    lines.append(f"  {name:<24}{kilobytes(size)}")
+                lines.append(f"  {'total':<24}{kilobytes(sum(subsystems.values()))}")
+                lines.append("  Tk: " + ", ".join(f"{count:,} {name}" for name, count in tk_counts.items()))
+                lines.append("")
+            lines.append(f"All documents: {total / 1024 / 1024:.1f} MB of {self.memory_budget_mb} MB budget")
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                lines.append(f"tracemalloc: {current / 1024 / 1024:.1f} MB now, {peak / 1024 / 1024:.1f} MB peak")
+                lines.append("Largest allocations:")
+                for statistic in tracemalloc.take_snapshot().statistics("lineno")[:8]:
+                    frame = statistic.traceback[0]
+                    lines.append(f"  {os.path.basename(frame.filename)}:{frame.lineno:<6}{kilobytes(statistic.size)}")
+            else:
+                lines.append("tracemalloc: not running")
+            report_text.config(state=tk.NORMAL)
+            report_text.delete("1.0", tk.END)
+            report_text.insert("1.0", "\n".join(lines))
+            report_text.config(state=tk.DISABLED)
+
+        def release():
+            for editor in TextWithLineNumbers.open_editors:
+                editor.release_memory(drop_caches=editor is not self)
+            refresh()
+
+        def toggle_tracing():
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            else:
+                tracemalloc.start()
+            refresh()
+
+        button_frame = tk.Frame(report_window)
+        tk.Button(button_frame, text="Refresh", command=refresh).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Release Memory", command=release).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Start/Stop tracemalloc", command=toggle_tracing).pack(side=tk.LEFT, padx=5)
+        button_frame.pack(pady=5, padx=10)
+        refresh()
+
+
+    #Multiple cursors / column selection ------------------------------
+    def _index_tuple(self, index):
+        line, col = self.text.index(index).split('.')
+        return int(line), int(col)
+
+
+    def _add_cursor_click(self, event):
+        # Control-click adds a cursor; the existing one becomes the first of the set
+        if not self.multi_cursors:
+            current = self._index_tuple(tk.INSERT)
+            self.multi_cursors = [(current, current)]
+        clicked = self._index_tuple(f"@{event.x},{event.y}")
+        self.multi_cursors.append((clicked, clicked))
+        self._show_multi_cursors()
+        return "break"
+
+
+    def _column_select_start(self, event):
+        self._column_anchor = self._index_tuple(f"@{event.x},{event.y}")
+        return self._column_select_drag(event)
+
+
+    def _column_select_drag(self, event):
+        # Alt-drag selects a rectangle: one range per line between the anchor and pointer columns
+        if self._column_anchor is None:
+            return "break"
+        anchor_line, anchor_col = self._column_anchor
+        line, col = self._index_tuple(f"@{event.x},{event.y}")
+        first_line, last_line = sorted((anchor_line, line))
+        left, right = sorted((anchor_col, col))
+        lines = self.text.get(f"{first_line}.0", f"{last_line}.end").split("\n")
+        self.multi_cursors = [((n, min(left, len(text))), (n, min(right, len(text))))
+                              for n, text in enumerate(lines, start=first_line)]
+        self.text.tag_remove(tk.SEL, "1.0", tk.END)
+        self._show_multi_cursors()
+        return "break"
+
+
+    def cursors_from_selection(self):
+        # Put a cursor at the end of every line the selection touches
+        try:
+            first_line = self._index_tuple(tk.SEL_FIRST)[0]
+            last_line, last_col = self._index_tuple(tk.SEL_LAST)
+        except tk.TclError:
+            return  # No text selected
+        if last_col == 0 and last_line > first_line:
+            last_line -= 1
+        lines = self.text.get(f"{first_line}.0", f"{last_line}.end").split("\n")
+        self.multi_cursors = [((n, len(text)), (n, len(text))) for n, text in enumerate(lines, start=first_line)]
+        self.text.tag_remove(tk.SEL, "1.0", tk.END)
+        self._show_multi_cursors()
+
+
+    def clear_multi_cursors(self):
+        if self.multi_cursors:
+            self.multi_cursors = []
+            self._show_multi_cursors()
+
+
+    def _show_multi_cursors(self):
+        # Sort and merge the cursors, then draw them all with one tag call per tag
+        merged = []
+        for start, end in sorted(set(self.multi_cursors)):
+            if merged and start < merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(end, merged[-1][1]))  # overlapping ranges
+            else:
+                merged.append((start, end))
+        if merged:
+            end_line, end_col = merged[-1][1]
+            self.text.mark_set(tk.INSERT, f"{end_line}.{end_col}")
+        # A single plain cursor is just the normal insert cursor again
+        self.multi_cursors = merged if len(merged) > 1 or (merged and merged[0][0] != merged[0][1]) else []
+
+        self.text.tag_remove("multicursor", "1.0", tk.END)
+        self.text.tag_remove("multiselect", "1.0", tk.END)
+        carets, ranges = [], []
+        for (start_line, start_col), (end_line, end_col) in self.multi_cursors:
+            if (start_line, start_col) == (end_line, end_col):
+                carets += [f"{start_line}.{start_col}", f"{start_line}.{start_col}+1c"]
+            else:
+                ranges += [f"{start_line}.{start_col}", f"{end_line}.{end_col}"]
+        if carets:
+            self.text.tag_add("multicursor", *carets)
+        if ranges:
+            self.text.tag_add("multiselect", *ranges)
+        self.update_status_bar()
+
+
+    def _multi_cursor_key(self, event):
+        if not self.multi_cursors:
+            return None  # Normal single cursor editing
+        control = event.state & 0x0004
+        if event.keysym.endswith(("_L", "_R")) or event.keysym in ("Caps_Lock", "ISO_Level3_Shift"):
+            return None  # a modifier on its own
+        if control and event.keysym.lower() == "v":
+            self.paste_text()
+        elif event.keysym == "BackSpace":
+            self.multi_cursor_edit("backspace")
+        elif event.keysym == "Delete":
+            self.multi_cursor_edit("delete")
+        elif event.keysym in ("Return", "KP_Enter"):
+            self.multi_cursor_edit("newline")
+        elif event.keysym == "Tab":
+            self.multi_cursor_edit("type", ' ' * self.tab_spaces if self.use_spaces_for_tab.get() else '\t')
+        elif event.keysym in ("Left", "Right"):
+            self.move_multi_cursors(-1 if event.keysym == "Left" else 1)
+        elif event.char and event.char.isprintable() and not control:
+            self.multi_cursor_edit("type", event.char)
+        else:
+            self.clear_multi_cursors()
+            return None
+        return "break"
+
+
+    def move_multi_cursors(self, step):
+        moved = []
+        for start, end in self.multi_cursors:
+            line, col = start if step < 0 else end
+            if start == end:
+                line, col = self._index_tuple(f"{line}.{col}{step:+d}c")
+            moved.append(((line, col), (line, col)))
+        self.multi_cursors = moved
+        self._show_multi_cursors()
+
+
+    def multi_cursor_edit(self, operation, text=""):
+        # Work out the keystroke at every cursor in Python, then apply it as one replace of the span they cover:
+        # one Tk edit, one edit-hook notification and one refresh however many cursors there are
+        if self.readonly_var.get() or not self.multi_cursors:
+            return
+        cursors = self.multi_cursors
+        last_buffer_line = int(self.text.index("end-1c").split('.')[0])
+        first_line = max(cursors[0][0][0] - 1, 1)  # one line of slack for backspace/delete across a line break
+        last_line = min(cursors[-1][1][0] + 1, last_buffer_line)
+        span = self.text.get(f"{first_line}.0", f"{last_line}.end")
+        line_starts = [0]
+        for line_text in span.split("\n"):
+            line_starts.append(line_starts[-1] + len(line_text) + 1)
+
+        def offset(position):
+            i = position[0] - first_line
+            return line_starts[i] + min(position[1], line_starts[i + 1] - line_starts[i] - 1)
+
+        pasted = text.split("\n") if operation == "paste" else None
+        one_line_each = pasted is not None and len(pasted) == len(cursors)
+        pieces, carets, length, done = [], [], 0, 0
+        for n, (start, end) in enumerate(cursors):
+            a, b = offset(start), offset(end)
+            if a == b and operation == "backspace" and a > 0:
+                a -= 1
+            elif a == b and operation == "delete" and b < len(span):
+                b += 1
+            if operation == "newline":
+                line_start = line_starts[start[0] - first_line]
+                indentation = re.match(r'[ \t¦]*', span[line_start:a]).group(0) if self.sticky_indentation.get() else ""
+                insert = "\n" + indentation
+            elif operation == "paste":
+                insert = pasted[n] if one_line_each else text
+            elif operation == "type":
+                insert = text
+            else:
+                insert = ""
+            a = max(a, done)
+            pieces.append(span[done:a])
+            pieces.append(insert)
+            length += a - done + len(insert)
+            carets.append(length)
+            done = max(a, b)
+        pieces.append(span[done:])
+        new_span = "".join(pieces)
+
+        protected_before = self._count_protected_lines(first_line, last_line) if self.protected_lines else 0
+        self._multi_editing = True
+        try:
+            self.text.replace(f"{first_line}.0", f"{last_line}.end", new_span)
+        finally:
+            self._multi_editing = False
+        if self.long_line_protection.get():
+            # the replace dropped the elide tags of the span, so long lines in it are cut off again
+            self.protected_lines += self._tag_long_lines(new_span, first_line) - protected_before
+            self.update_status_bar()
+
+        positions, line, line_start, counted_to = [], first_line, 0, 0
+        for caret in carets:
+            newlines = new_span.count("\n", counted_to, caret)
+            if newlines:
+                line += newlines
+                line_start = new_span.rfind("\n", 0, caret) + 1
+            counted_to = caret
+            positions.append((line, caret - line_start))
+        self.multi_cursors = [(position, position) for position in positions]
+        self._show_multi_cursors()
+        self._update_line_numbers()
+
+
+    #Change markers ---------------------------------------------------
+    def schedule_change_markers(self):
+        if self._change_job is not None:
+            self.after_cancel(self._change_job)
+        self._change_job = self.after(300, self.refresh_change_markers)
+
+
+    def refresh_change_markers(self):
+        # Re-diff the hunks around the lines edited since the last refresh, then repaint the gutters
+        self._change_job = None
+        self.change_tracker.realign()
+        self.sync_line_numbers_view()
+        if self.show_minimap_var.get():
+            self.minimap.set_changes(self.change_tracker.changed_spans())
+
+
+    def goto_next_change(self):
+        self._goto_change(1)
+
+
+    def goto_previous_change(self):
+        self._goto_change(-1)
+
+
+    def _goto_change(self, direction):
+        self.change_tracker.realign()
+        starts = self.change_tracker.change_lines()
+        line = int(self.text.index(tk.INSERT).split('.')[0])
+        if direction > 0:
+            position = bisect.bisect_right(starts, line)
+            target = starts[position] if position < len(starts) else None
+        else:
+            position = bisect.bisect_left(starts, line)
+            target = starts[position - 1] if position > 0 else None
+        if target is None:
+            self.bell()
+        else:
+            self.goto_line(target)
+
+
+    #Long line protection ---------------------------------------------
+    def protect_long_lines(self, content=None):
+        # Elide everything past long_line_limit on very long lines so Tk never lays them out in full
+        self.text.tag_remove("longline", "1.0", tk.END)
+        self.text.tag_remove("longline_edge", "1.0", tk.END)
+        self.protected_lines = 0
+        if self.long_line_protection.get():
+            if content is None:
+                content = self.text.get("1.0", "end-1c")
+            if self.show_indentation_var.get() and re.search(r'^[^\n]{%d,}' % (self.long_line_limit + 1), content, re.MULTILINE):
+                # the marker rewrites would drop the elide tags again, so indentation display goes off first
+                self.show_indentation_var.set(False)
+                self.hide_indentation()
+                content = self.text.get("1.0", "end-1c")
+            self.protected_lines = self._tag_long_lines(content, 1)
+            self.text.tag_configure("longline", elide=True)
+            self.text.tag_configure("longline_edge", background="#808080")
+        self.update_status_bar()
+
+
+    def _tag_long_lines(self, content, first_line):
+        # Tag the long lines of content, which starts at first_line of the buffer; returns how many there were
+        limit = self.long_line_limit
+        line_number, counted_to, count = first_line, 0, 0
+        for match in re.finditer(r'^[^\n]{%d,}' % (limit + 1), content, re.MULTILINE):
+            line_number += content.count("\n", counted_to, match.start())
+            counted_to = match.start()
+            self.text.tag_add("longline", f"{line_number}.{limit}", f"{line_number}.end")
+            self.text.tag_add("longline_edge", f"{line_number}.{limit - 1}")
+            count += 1
+        return count
+
+
+    def _count_protected_lines(self, first_line, last_line):
+        # Protected lines in first_line..last_line, each of which carries one longline_edge mark
+        count, index = 0, f"{first_line}.0"
+        while True:
+            found = self.text.tag_nextrange("longline_edge", index, f"{last_line}.end")
+            if not found:
+                return count
+            count += 1
+            index = found[1]
+
+
+    def reveal_long_line(self, start, end):
+        # Show start..end of a protected line's hidden tail (a search hit) and leave the rest of it hidden
+        if "longline" in self.text.tag_names(start):
+            self.text.tag_remove("longline", start, end)
+            self.text.tag_add("longline_edge", f"{start}-1c")
+
+
+    def toggle_long_line_protection(self):
+        if self.show_indentation_var.get():
+            self.show_indentation_var.set(False)
+            self.hide_indentation()  # rewrites the buffer, so it has to happen before tagging
+        self.protect_long_lines()
+
+
+    def expand_long_line(self):
+        # Show the next long_line_limit characters of the protected line under the cursor
+        line = self.text.index(tk.INSERT).split('.')[0]
+        hidden = self.text.tag_nextrange("longline", f"{line}.0", f"{line}.end")
+        if not hidden:
+            return
+        start, end = hidden
+        shown_to = self.text.index(f"{start}+{self.long_line_limit}c")
+        self.text.tag_remove("longline", start, shown_to)
+        self.text.tag_remove("longline_edge", f"{line}.0", f"{line}.end")
+        if self.text.compare(shown_to, "<", end):
+            self.text.tag_add("longline_edge", f"{shown_to}-1c")
+        else:
+            self.protected_lines -= 1
+        self.update_status_bar()
+
+
+    #Split view -------------------------------------------------------
+    def toggle_split_view(self):
+        if self.split_view_var.get():
+            self.open_split_view()
+        else:
+            self.close_split_view()
+
+
+    def open_split_view(self):
+        # The second pane is a Tk peer of self.text: same B-tree, its own view, cursor and selection
+        if self.split_pane is not None:
+            return
+        self.split_pane = tk.Frame(self)
+        self.split_text = PeerText(self.split_pane, self.text, wrap=self.text.cget("wrap"), font=self.text.cget("font"), state=self.text.cget("state"))
+        self.split_gutter = LineGutter(self.split_pane, self.split_text, font=self.text.cget("font"), change_tracker=self.change_tracker)
+        split_scrollbar = tk.Scrollbar(self.split_pane, orient=tk.VERTICAL, command=self.split_text.yview)
+
+        def split_yscroll(first, last):
+            split_scrollbar.set(first, last)
+            self.split_gutter.schedule_redraw()
+
+        self.split_text.config(yscrollcommand=split_yscroll)
+        self.split_gutter.grid(row=0, column=0, sticky="ns")
+        self.split_text.grid(row=0, column=1, sticky="nsew")
+        split_scrollbar.grid(row=0, column=2, sticky="ns")
+        self.split_pane.grid_rowconfigure(0, weight=1)
+        self.split_pane.grid_columnconfigure(1, weight=1)
+        self.split_pane.grid(row=2, column=0, columnspan=3, sticky="nsew")
+        self.grid_rowconfigure(2, weight=1)
+
+        self._install_edit_hook(self.split_text)
+        self.split_text.bind('<Tab>', self.handle_tab)
+        self.split_text.bind('<Return>', self.handle_enter)
+        self.split_text.bind('<FocusIn>', self.restore_caches)
+        self.split_text.bind('<Control-z>', self.undo)  # the panes share one history; Tk's own undo is off
+        self.split_text.bind('<Control-y>', self.redo)
+        self.split_text.bind('<Control-Z>', self.redo)  # Control-Shift-z
+        self.split_text.bind('<Configure>', self.sync_line_numbers_view)
+        self.split_text.bind('<KeyRelease>', lambda e: self.split_gutter.schedule_redraw())
+        self.toggle_dark_mode()
+
+        # Open the new pane on the same spot as the main one
+        self.split_text.mark_set(tk.INSERT, self.text.index(tk.INSERT))
+        self.split_text.yview(self.text.index("@0,0"))
+        self.split_view_var.set(True)
+
+
+    def close_split_view(self):
+        if self.split_pane is None:
+            return
+        self.tk.deletecommand(self.split_text._w)  # drop the edit hook; Tk removes the renamed widget command itself
+        self.split_pane.destroy()
+        self.grid_rowconfigure(2, weight=0)
+        self.split_pane = self.split_text = self.split_gutter = None
+        self.split_view_var.set(False)
+        self.text.focus_set()
+
+
+    #Symbol outline / Go to symbol -------------------------------------
+    def schedule_symbol_index(self):
+        # Any edit invalidates a parse in flight; rebuild once typing goes quiet
+        self._symbol_generation += 1
+        if self._symbol_job is not None:
+            self.after_cancel(self._symbol_job)
+        self._symbol_job = self.after(self.symbol_idle_ms, self.rebuild_symbol_index)
+
+
+    def rebuild_symbol_index(self):
+        self._symbol_job = None
+        if self.protected_lines:
+            self._apply_symbols([])  # minified or single line data has no useful outline
+            return
+        content = self.text.get("1.0", "end-1c")
+        if self.show_indentation_var.get():
+            content = content.replace("¦", " ")
+        self.symbol_indexer.submit(self._symbol_generation, content, self.filename)
+        if self._symbol_poll_job is None:
+            self._poll_symbol_index()
+
+
+    def _poll_symbol_index(self):
+        # The parse runs in a worker process - collect its result here on the Tk thread
+        self._symbol_poll_job = None
+        result = self.symbol_indexer.result()
+        if result is None:
+            self._symbol_poll_job = self.after(50, self._poll_symbol_index)
+        elif result[0] == self._symbol_generation:
+            self._apply_symbols(result[1])
+
+
+    def _apply_symbols(self, symbols):
+        # Anchor every symbol to a mark so Tk keeps its line current as text above it changes
+        if self._symbols:
+            self.text.mark_unset(*[mark for mark, _, _, _ in self._symbols])
+        self._symbols = []
+        for i, (line, depth, kind, name) in enumerate(symbols):
+            mark = f"symbol{i}"
+            self.text.mark_set(mark, f"{line}.0")
+            self._symbols.append((mark, depth, kind, name))
+        self._refresh_outline_panel()
+
+
+    def symbol_line(self, mark):
+        return int(self.text.index(mark).split('.')[0])
+
+
+    def toggle_outline_panel(self):
+        if self.show_outline_var.get():
+            self.outline_panel.grid()
+            self._refresh_outline_panel()
+        else:
+            self.outline_panel.grid_remove()
+
+
+    def toggle_minimap(self):
+        if self.show_minimap_var.get():
+            self.minimap.grid()
+            self.minimap.change_spans = self.change_tracker.changed_spans()
+            self.minimap.schedule_redraw(full=True)
+        else:
+            self.minimap.grid_remove()
+
+
+    def _refresh_outline_panel(self):
+        if not self.show_outline_var.get():
+            return
+        self.outline_panel.delete(0, tk.END)
+        for _, depth, kind, name in self._symbols:
+            self.outline_panel.insert(tk.END, "  " * depth + f"{kind} {name.rsplit('.', 1)[-1]}")
+
+
+    def _outline_select(self, event=None):
+        selection = self.outline_panel.curselection()
+        if selection and selection[0] < len(self._symbols):
+            self.goto_line(self.symbol_line(self._symbols[selection[0]][0]))
+
+
+    def goto_line(self, line, col=0):
+        self.restore_view(f"{line}.{col}", max(1, line - 2))
+        self.text.focus_set()
+        self.update_status_bar()
+
+
+    def open_goto_symbol_dialog(self):
+        symbol_window = tk.Toplevel(self)
+        symbol_window.title("Go to Symbol")
+
+        label = tk.Label(symbol_window, text="Symbol name:")
+        label.pack(pady=10, padx=10)
+
+        symbol_entry = tk.Entry(symbol_window, width=40)
+        symbol_entry.pack(pady=5, padx=10)
+        symbol_entry.focus_set()
+
+        symbol_list = tk.Listbox(symbol_window, width=40, height=15, activestyle="none")
+        symbol_list.pack(pady=5, padx=10, fill=tk.BOTH, expand=True)
+        matches = []
+
+        def filter_symbols(event=None):
+            needle = symbol_entry.get().lower()
+            matches[:] = [entry for entry in self._symbols if needle in entry[3].lower()]
+            symbol_list.delete(0, tk.END)
+            for _, _, kind, name in matches:
+                symbol_list.insert(tk.END, f"{kind} {name}")
+            if matches:
+                symbol_list.selection_set(0)
+
+        def jump(event=None):
+            selection = symbol_list.curselection()
+            if matches:
+                mark = matches[selection[0] if selection else 0][0]
+                symbol_window.destroy()
+                self.goto_line(self.symbol_line(mark))
+
+        symbol_entry.bind("<KeyRelease>", filter_symbols)
+        symbol_entry.bind("<Return>", jump)
+        symbol_list.bind("<Double-Button-1>", jump)
+        symbol_list.bind("<Return>", jump)
+        filter_symbols()
+
+
+    #Word completion --------------------------------------------------
+    def _schedule_completion(self, event):
+        # Runs from _key_release - the lookup itself is deferred so the key handler stays cheap
+        if not self.autocomplete_var.get() or event is None or self.multi_cursors:
+            return
+        if event.keysym in ("Up", "Down", "Tab", "Return", "Escape"):
+            return
+        if event.char and (event.char.isalnum() or event.char == "_") or event.keysym == "BackSpace":
+            self.after_idle(self.update_completion)
+        else:
+            self.hide_completion()
+
+
+    def update_completion(self):
+        match = re.search(r'[A-Za-z_]\w*$', self.text.get("insert-64c", tk.INSERT))
+        prefix = match.group(0) if match else ""
+        if len(prefix) < 2:
+            self.hide_completion()
+            return
+
+        line = int(self.text.index(tk.INSERT).split('.')[0])
+        others = [editor.word_index for editor in TextWithLineNumbers.open_editors if editor is not self]
+        words = self.word_index.complete(prefix, line, others)
+        if not words:
+            self.hide_completion()
+            return
+        self._completion_prefix = prefix
+        self.show_completion(words)
+
+
+    def show_completion(self, words):
+        if self.completion_popup is None:
+            self.completion_popup = tk.Toplevel(self)
+            self.completion_popup.overrideredirect(True)
+            self.completion_list = tk.Listbox(self.completion_popup, height=8, activestyle="none", exportselection=False)
+            self.completion_list.pack(fill=tk.BOTH, expand=True)
+            self.completion_list.bind("<Double-Button-1>", lambda e: self.accept_completion())
+            self.toggle_dark_mode()
+
+        bbox = self.text.bbox(tk.INSERT)
+        if not bbox:
+            self.hide_completion()
+            return
+        x, y, _, height = bbox
+        self.completion_list.delete(0, tk.END)
+        for word in words:
+            self.completion_list.insert(tk.END, word)
+        self.completion_list.selection_set(0)
+        self.completion_list.config(height=min(len(words), 8))
+        self.completion_popup.geometry(f"+{self.text.winfo_rootx() + x}+{self.text.winfo_rooty() + y + height}")
+        self.completion_popup.deiconify()
+        self.completion_popup.lift()
+
+
+    def hide_completion(self, event=None):
+        if self.completion_visible():
+            self.completion_popup.withdraw()
+            return "break"
+        return None
+
+
+    def completion_visible(self):
+        return self.completion_popup is not None and self.completion_popup.winfo_ismapped()
+
+
+    def accept_completion(self):
+        selection = self.completion_list.curselection()
+        if selection:
+            word = self.completion_list.get(selection[0])
+            self.text.insert(tk.INSERT, word[len(self._completion_prefix):])
+        self.hide_completion()
+
+
+    def _completion_move(self, step):
+        if not self.completion_visible():
+            return None  # Let the cursor move as normal
+        selection = self.completion_list.curselection()
+        index = (selection[0] if selection else 0) + step
+        index = max(0, min(index, self.completion_list.size() - 1))
+        self.completion_list.selection_clear(0, tk.END)
+        self.completion_list.selection_set(index)
+        self.completion_list.see(index)
+        return "break"
+
+    def _completion_up(self, event):
+        self.clear_multi_cursors()
+        return self._completion_move(-1)
+
+    def _completion_down(self, event):
+        self.clear_multi_cursors()
+        return self._completion_move(1)
+
+
+    #Text transforms --------------------------------------------------
+    def apply_transform(self, transform, *args):
+        # Run one of the module level transforms over the whole buffer; returns its count
+        if self.text.cget("state") != tk.NORMAL:
+            return 0  # read only - nothing may change
+        cursor_position = self.text.index(tk.INSERT)
+        top_line = int(self.text.index("@0,0").split('.')[0])
+        content = self.text.get("1.0", "end-1c")
+        if self.show_indentation_var.get():
+            content = unmark_indentation(content)
+        updated_content, count = transform(content, *args)
+        if updated_content == content:
+            return count
+        if self.show_indentation_var.get():
+            updated_content = mark_indentation(updated_content, self.tab_spaces)
+        self.text.replace("1.0", "end-1c", updated_content)  # one edit, so undo keeps just the changed stretch
+        self.protect_long_lines(updated_content)  # the rewrite dropped the elide tags
+        self._update_line_numbers()  # Refresh line numbers
+        self.restore_view(cursor_position, top_line)
+        self.update_status_bar()
+        return count
+
+
+    def toggle_readonly(self):
+        # Peers keep their own state, so the split pane has to follow the main pane
+        state = tk.DISABLED if self.readonly_var.get() else tk.NORMAL
+        self.text.config(state=state)
+        if self.split_text is not None:
+            self.split_text.config(state=state)
+        self.update_status_bar()
 
 
     #Other functions --------------------------------------------------
     def apply_font_attributes(self):
         self.text.config(font=(self.my_font, self.default_font_size))
         self.line_numbers.config(font=(self.my_font, self.default_font_size))
+        if self.split_text is not None:
+            self.split_text.config(font=(self.my_font, self.default_font_size))
+            self.split_gutter.config(font=(self.my_font, self.default_font_size))
 
 
     #validate that a string is a valid color hex code
@@ -447,16 +1571,28 @@ class TextWithLineNumbers(tk.Frame):
         # Display filename or "Unnamed" on the left side
         filename_display = "Filename: "
         filename_display += self.filename if self.filename else "Unnamed"
+        if self.readonly_var.get():
+            filename_display += " (read only)"
         self.status_label_left.config(text=filename_display)
 
         # Display line and column number on the right side
         line, col = self.text.index(tk.INSERT).split('.')
-        self.status_label_right.config(text=f"Line: {line} | Col: {col}")
+        position_display = f"Line: {line} | Col: {col}"
+        if self.protected_lines:
+            position_display = f"Long lines cut off: {self.protected_lines} | " + position_display
+        if self.multi_cursors:
+            position_display = f"Cursors: {len(self.multi_cursors)} | " + position_display
+        self.status_label_right.config(text=position_display)
 
 
     def handle_tab(self, event):
+        if self.multi_cursors:
+            return self._multi_cursor_key(event)
+        if self.completion_visible():
+            self.accept_completion()
+            return "break"
         if self.use_spaces_for_tab.get():
-            self.text.insert(tk.INSERT, ' ' * self.tab_spaces)
+            event.widget.insert(tk.INSERT, ' ' * self.tab_spaces)
             return "break"  # This prevents the default behavior
         return None  # This allows the normal Tab behavior if the option is not checked
 
@@ -480,6 +1616,41 @@ class TextWithLineNumbers(tk.Frame):
             fg=mode_colors['fg-linenum']
         )
 
+        # Update split view pane
+        if self.split_text is not None:
+            self.split_text.config(
+                bg=mode_colors['bg'],
+                fg=mode_colors['fg'],
+                insertbackground=mode_colors['insertbackground']
+            )
+            self.split_gutter.config(
+                bg=mode_colors['bg'],
+                fg=mode_colors['fg-linenum']
+            )
+
+        # Update extra cursors - drawn as block cursors in the cursor colour
+        self.text.tag_configure("multicursor", background=mode_colors['insertbackground'], foreground=mode_colors['bg'])
+        self.text.tag_configure("multiselect", background="#6A8CAF")
+
+        # Update minimap
+        self.minimap.config(
+            bg=mode_colors['bg'],
+            fg=mode_colors['fg-linenum']
+        )
+
+        # Update outline panel
+        self.outline_panel.config(
+            bg=mode_colors['bg'],
+            fg=mode_colors['fg-linenum']
+        )
+
+        # Update completion popup
+        if self.completion_list is not None:
+            self.completion_list.config(
+                bg=mode_colors['bg'],
+                fg=mode_colors['fg']
+            )
+
         # Update status bar
         self.status_bar.config(
             bg=mode_colors['bg']
@@ -505,29 +1676,8 @@ class TextWithLineNumbers(tk.Frame):
 
 
     def _update_line_numbers(self):
-        lines = int(self.text.index("end-1c").split('.')[0])  # Get the total number of lines
-        line_numbers = []
-        for i in range(1, lines + 1):
-            wraps = self.inspect_wrapline_at(i)
-            if wraps == 1:  # If there's no wrap, just append the line number
-                line_numbers.append(str(i))
-            else:  # If there's wrapping, append the line number once, and blanks for the remaining wrapped lines
-                line_numbers.append(str(i))
-                line_numbers.extend([''] * (wraps - 1))
-        line_nums = '\n'.join(line_numbers)
-
-        self.line_numbers.configure(state=tk.NORMAL)
-        self.line_numbers.config(font=(self.my_font, self.default_font_size))
-        self.line_numbers.delete(1.0, tk.END)
-        self.line_numbers.insert(1.0, line_nums)
-        self.line_numbers.configure(state=tk.DISABLED)
-
-
-    def inspect_wrapline_at(self, line):
-        start = f"{line}.0 linestart"
-        end = f"{line}.0 lineend"
-        counter = self.text.count(start, end, "displaylines")
-        return counter[0] + 1 if counter else 1
+        # The gutters draw just the visible lines, so this costs the same for any file size
+        self.sync_line_numbers_view()
 
 
     #Font Selection Dialog -------------------------------------------
@@ -648,10 +1798,8 @@ class TextWithLineNumbers(tk.Frame):
 
         def apply_font_size():
             size = spinbox.get()
-            self.text.config(font=(self.my_font, size))
-            self.line_numbers.config(font=(self.my_font, size))
-            self.line_numbers.config(font=(self.my_font, size))
             self.default_font_size = int(size)  # Save the selected size
+            self.apply_font_attributes()
             font_dialog.destroy()
 
         apply_button = tk.Button(button_frame, text="Apply", command=apply_font_size)
@@ -693,7 +1841,12 @@ class TextWithLineNumbers(tk.Frame):
             self.text.tag_remove("search", 1.0, tk.END)
 
             # Search for the string from the current cursor position to the end of the text
-            pos = self.text.search(search_entry.get(), self.text.index(tk.INSERT), stopindex=tk.END)
+            pos = self.text.search(search_entry.get(), self.text.index(tk.INSERT), stopindex=tk.END, elide=True)
+
+            # Mark every occurrence on the minimap
+            if search_entry.get():
+                hits = self.tk.call(self.text._w, "search", "-all", "-elide", "--", search_entry.get(), "1.0", tk.END)
+                self.minimap.set_search_hits(int(str(hit).split('.')[0]) for hit in hits)
 
             # Highlight the found string
             if pos:
@@ -703,6 +1856,7 @@ class TextWithLineNumbers(tk.Frame):
                 end = f"{row}.{int(col) + length}"
                 self.text.tag_add("search", pos, end)
                 self.text.tag_configure("search", background="yellow")
+                self.reveal_long_line(pos, end)
                 self.text.mark_set(tk.INSERT, end)
                 self.text.see(tk.INSERT)
             else:
@@ -711,6 +1865,13 @@ class TextWithLineNumbers(tk.Frame):
                 else:
                     tk.messagebox.showinfo("Search Result", f"Text not found! Searched {search_count} times.")
 
+        def perform_replace_all():
+            nonlocal replace_count
+            self.text.tag_remove("search", 1.0, tk.END)
+            count = self.apply_transform(replace_all, search_entry.get(), replace_entry.get())
+            replace_count += count
+            tk.messagebox.showinfo("Replace All", f"Replaced {count} times.")
+
         def perform_replace():
             nonlocal replace_count
             # Check if there's any highlighted text
@@ -736,10 +1897,13 @@ class TextWithLineNumbers(tk.Frame):
             replace_button = tk.Button(button_frame, text="Replace", command=perform_replace)
             # Changed packing of the replace_button
             replace_button.pack(side=tk.LEFT, padx=5)
+            replace_all_button = tk.Button(button_frame, text="Replace All", command=perform_replace_all)
+            replace_all_button.pack(side=tk.LEFT, padx=5)
 
         button_frame.pack(pady=5, padx=10)
 
         search_entry.bind("<Return>", lambda e: perform_search())
+        search_window.bind("<Destroy>", lambda e: e.widget is search_window and self.minimap.set_search_hits(()))
 
 
     #Configuration Options Dialog -----------------------------------------------------------
@@ -826,6 +1990,16 @@ class TextWithLineNumbers(tk.Frame):
                 if num_spaces <= 0:
                     raise ValueError("Number of spaces for tab should be a positive integer")
 
+                # Ensure the undo history limit is a positive integer
+                undo_budget = int(undo_budget_var.get())
+                if undo_budget <= 0:
+                    raise ValueError("Undo history limit should be a positive integer")
+
+                # Ensure the memory budget is a positive integer
+                memory_budget = int(memory_budget_var.get())
+                if memory_budget <= 0:
+                    raise ValueError("Memory budget should be a positive integer")
+
                 # Save to the configuration file
                 config = {
                     'word_wrap': self.word_wrap.get(),
@@ -843,16 +2017,28 @@ class TextWithLineNumbers(tk.Frame):
                     'light_cursor': light_cursor_var.get(),
                     'font_size': self.default_font_size,
                     'font_family': self.my_font,
+                    'undo_budget_mb': undo_budget,
+                    'memory_budget_mb': memory_budget,
                 }
                 config_manager = ConfigManager()
                 config_manager.write_config(config)
                 main_window.destroy()
                 self.load_configurations()
+                self.undo_history.set_budget(self.undo_budget_mb * 1024 * 1024)
+                self.minimap.tab_width = self.tab_spaces
                 self.toggle_dark_mode()
             except ValueError as e:
                 tk.messagebox.showerror("Invalid Value", str(e))
 
-        tk.Button(main_frame, text="Apply", command=apply_config).grid(row=15, column=0, columnspan=2)
+        undo_budget_var = tk.StringVar(value=str(self.undo_budget_mb))
+        tk.Label(main_frame, text="Undo History Limit (MB):").grid(row=15, column=0, sticky="w")
+        tk.Entry(main_frame, textvariable=undo_budget_var).grid(row=15, column=1)
+
+        memory_budget_var = tk.StringVar(value=str(self.memory_budget_mb))
+        tk.Label(main_frame, text="Memory Budget (MB):").grid(row=16, column=0, sticky="w")
+        tk.Entry(main_frame, textvariable=memory_budget_var).grid(row=16, column=1)
+
+        tk.Button(main_frame, text="Apply", command=apply_config).grid(row=17, column=0, columnspan=2)
 
     #Load configurations
     def load_configurations(self):
@@ -868,6 +2054,8 @@ class TextWithLineNumbers(tk.Frame):
             self.tab_spaces = config.get('tab_spaces', self.tab_spaces)
             self.default_font_size = config.get('font_size', self.default_font_size)
             self.my_font = config.get('font_family', self.my_font)
+            self.undo_budget_mb = config.get('undo_budget_mb', self.undo_budget_mb)
+            self.memory_budget_mb = config.get('memory_budget_mb', self.memory_budget_mb)
 
             # Color configurations
             self.dark_mode['fg'] = config.get('dark_fg', self.dark_mode['fg'])
@@ -901,12 +2089,998 @@ class ConfigManager:
             json.dump(config, file, indent=4)
 
 
-if __name__ == '__main__':
+class LineGutter(tk.Canvas):
+    """Line numbers for a text widget, drawn only for the lines that are on screen."""
+
+    marker_colors = {"added": "#2EA043", "modified": "#1F6FEB", "deleted": "#DA3633"}
+
+    def __init__(self, master, text, font=None, fg="#000000", change_tracker=None, **kwargs):
+        super().__init__(master, width=1, highlightthickness=0, takefocus=0, **kwargs)
+        self.text = text
+        self.change_tracker = change_tracker
+        self.font = font or text.cget("font")
+        self.fg = fg
+        self.digits = 0
+        self._redraw_job = None
+        self.bind("<Destroy>", self._cancel_redraw)
+
+    def configure(self, cnf=None, **kw):
+        # Accept font and fg like the Text widget this gutter used to be
+        kw = tk._cnfmerge((cnf, kw)) if cnf else kw
+        if "font" in kw:
+            self.font = kw.pop("font")
+            self.digits = 0  # re-measure
+        if "fg" in kw:
+            self.fg = kw.pop("fg")
+        self.schedule_redraw()
+        return super().configure(**kw) if kw else None
+
+    config = configure
+
+    def schedule_redraw(self, event=None):
+        if self._redraw_job is None:
+            self._redraw_job = self.after_idle(self.redraw)
+
+    def _cancel_redraw(self, event=None):
+        if self._redraw_job is not None:
+            self.after_cancel(self._redraw_job)
+            self._redraw_job = None
+
+    def redraw(self):
+        self._redraw_job = None
+        self.delete("all")
+        last_line = int(self.text.index("end-1c").split('.')[0])
+        digits = max(len(str(last_line)), 3)
+        if digits != self.digits:
+            self.digits = digits
+            width = tk.font.Font(root=self, font=self.font).measure("0" * digits) + 12
+            super().configure(width=width)
+        x = int(self.cget("width")) - 4
+
+        first_line = line = int(self.text.index("@0,0").split('.')[0])
+        while line <= last_line:
+            info = self.text.dlineinfo(f"{line}.0")
+            if info is None:
+                if line == first_line:
+                    line += 1  # the top line is wrapped and its start is scrolled out of view
+                    continue
+                break  # past the bottom of the view
+            self.create_text(x, info[1], anchor="ne", text=str(line), font=self.font, fill=self.fg)
+            if self.change_tracker is not None:
+                state, deleted_above = self.change_tracker.marker(line)
+                if state:
+                    self.create_rectangle(0, info[1], 3, info[1] + info[3], width=0, fill=self.marker_colors[state])
+                if deleted_above:
+                    self.create_polygon(0, info[1] - 3, 5, info[1], 0, info[1] + 3, width=0, fill=self.marker_colors["deleted"])
+            line += 1
+
+
+class Minimap(tk.Canvas):
+    """Overview of the whole buffer drawn from per-line lengths and indents, one canvas item per row."""
+
+    columns = 120  # line length that fills the minimap width
+    blank = 255  # indent stored for empty lines, so they never narrow a row's indent
+    search_color = "#E3B341"
+
+    def __init__(self, master, text, tab_width=4, fg="#000000", **kwargs):
+        super().__init__(master, width=80, highlightthickness=0, takefocus=0, **kwargs)
+        self.text = text
+        self.tab_width = tab_width
+        self.fg = fg
+        self.lengths = array.array('H', [0])  # per buffer line, capped at 65535
+        self.indents = array.array('B', [self.blank])  # per buffer line, capped at 254
+        self.rows = []  # canvas item of each row
+        self.lines_per_row = 1
+        self.row_height = 1
+        self.change_spans = []
+        self.search_lines = []
+        self._dirty = None  # (first, last) 0-based lines to redraw, last is None when everything below shifted
+        self._markers_dirty = False
+        self._layout = None
+        self._redraw_job = None
+        self.bind("<Configure>", lambda e: self.schedule_redraw(full=True))
+        self.bind("<Destroy>", self._cancel_redraw)
+        self.bind("<Button-1>", self._jump)
+        self.bind("<B1-Motion>", self._jump)
+
+    def configure(self, cnf=None, **kw):
+        kw = tk._cnfmerge((cnf, kw)) if cnf else kw
+        if "fg" in kw:
+            self.fg = kw.pop("fg")
+            self.itemconfigure("row", fill=self.fg)
+            self.itemconfigure("view", outline=self.fg)
+        return super().configure(**kw) if kw else None
+
+    config = configure
+
+    def _measure(self, line):
+        # (length, indent) of one line with tabs expanded
+        stripped = line.lstrip(" \t")
+        if not stripped:
+            return min(len(line), 65535), self.blank
+        indent = len(line) - len(stripped)
+        indent += line.count("\t", 0, indent) * (self.tab_width - 1)
+        return min(len(stripped) + indent, 65535), min(indent, self.blank - 1)
+
+    def update_lines(self, first_line, old_last_line, new_text):
+        # Same contract as WordIndex.update_lines; only the arrays change here, drawing waits for idle
+        measured = [self._measure(line) for line in new_text.split("\n")]
+        self.lengths[first_line - 1:old_last_line] = array.array('H', [length for length, _ in measured])
+        self.indents[first_line - 1:old_last_line] = array.array('B', [indent for _, indent in measured])
+        shifted = len(measured) != old_last_line - first_line + 1
+        last = None if shifted else first_line - 1 + len(measured)
+        if self._dirty is not None:
+            first = min(self._dirty[0], first_line - 1)
+            last = None if last is None or self._dirty[1] is None else max(self._dirty[1], last)
+        else:
+            first = first_line - 1
+        self._dirty = (first, last)
+        if self.search_lines:
+            self._shift_search_lines(first_line, old_last_line, len(measured))
+        self.schedule_redraw()
+
+    def _shift_search_lines(self, first_line, old_last_line, new_line_count):
+        # Hits below an edit move with it; hits on the edited lines are dropped until the next search
+        start = bisect.bisect_left(self.search_lines, first_line)
+        end = bisect.bisect_right(self.search_lines, old_last_line)
+        shift = new_line_count - (old_last_line - first_line + 1)
+        if end > start or shift:
+            self.search_lines[start:] = [line + shift for line in self.search_lines[end:]]
+            self._markers_dirty = True
+
+    def schedule_redraw(self, full=False):
+        if full:
+            self._layout = None
+        if self._redraw_job is None:
+            self._redraw_job = self.after(100, self.redraw)
+
+    def _cancel_redraw(self, event=None):
+        if self._redraw_job is not None:
+            self.after_cancel(self._redraw_job)
+            self._redraw_job = None
+
+    def redraw(self):
+        self._redraw_job = None
+        if not self.winfo_ismapped():
+            return  # hidden; toggle_minimap asks for a full redraw when it is shown again
+        line_count = len(self.lengths)
+        height = max(self.winfo_height(), 1)
+        self.row_height = 2 if line_count * 2 <= height else 1
+        self.lines_per_row = -(-line_count * self.row_height // height)
+        row_count = -(-line_count // self.lines_per_row)
+        layout = (row_count, self.row_height, height, self.winfo_width())
+        if layout != self._layout:
+            self._layout = layout
+            self.delete("all")
+            self.rows = [self.create_rectangle(0, 0, 0, 0, width=0, fill=self.fg, tags="row") for _ in range(row_count)]
+            self.create_rectangle(0, 0, 0, 0, outline=self.fg, tags="view")
+            self._dirty = (0, None)
+            self._markers_dirty = True
+            self.show_view(*self.text.yview())
+        if self._markers_dirty:
+            self._draw_markers()
+        if self._dirty is None:
+            return
+        first, last = self._dirty
+        self._dirty = None
+        last_row = row_count - 1 if last is None else min((last - 1) // self.lines_per_row, row_count - 1)
+        scale = (self.winfo_width() - 8) / self.columns
+        for row in range(first // self.lines_per_row, last_row + 1):
+            a, b = row * self.lines_per_row, (row + 1) * self.lines_per_row
+            indent, length = min(self.indents[a:b]), max(self.lengths[a:b])
+            x0 = 4 + min(indent, length) * scale
+            y = row * self.row_height
+            self.coords(self.rows[row], x0, y, max(x0, 4 + length * scale), y + self.row_height)
+
+    def _row_spans(self, spans):
+        # Collapse (first line, last line, key) spans into non-overlapping row spans
+        merged = []
+        for first, last, key in spans:
+            r0, r1 = (first - 1) // self.lines_per_row, (last - 1) // self.lines_per_row
+            if merged and merged[-1][2] == key and r0 <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], r1)
+            else:
+                merged.append([r0, r1, key])
+        return merged
+
+    def _draw_markers(self):
+        self._markers_dirty = False
+        self.delete("marker")
+        width = self.winfo_width()
+        for r0, r1, state in self._row_spans(self.change_spans):
+            self.create_rectangle(0, r0 * self.row_height, 3, (r1 + 1) * self.row_height,
+                                  width=0, fill=LineGutter.marker_colors[state], tags="marker")
+        for r0, r1, _ in self._row_spans((line, line, None) for line in self.search_lines):
+            self.create_rectangle(width - 3, r0 * self.row_height, width, (r1 + 1) * self.row_height + 1,
+                                  width=0, fill=self.search_color, tags="marker")
+
+    def memory_use(self):
+        return sys.getsizeof(self.lengths) + sys.getsizeof(self.indents) + sys.getsizeof(self.rows)
+
+    def clear(self):
+        # Back to an empty one-line buffer; update_lines(1, 1, text) fills it again
+        self.lengths = array.array('H', [0])
+        self.indents = array.array('B', [self.blank])
+        self.search_lines = []
+        self.schedule_redraw(full=True)
+
+    def set_changes(self, spans):
+        self.change_spans = spans
+        self._draw_markers()
+
+    def set_search_hits(self, lines):
+        self.search_lines = sorted(set(lines))
+        self._draw_markers()
+
+    def show_view(self, first, last):
+        # Outline the part of the buffer that is on screen
+        content = len(self.rows) * self.row_height
+        self.coords("view", 1, float(first) * content, self.winfo_width() - 1, float(last) * content)
+
+    def _jump(self, event):
+        # Centre the clicked line with one index based yview call; yview fractions count display lines,
+        # which differ from buffer lines when the text wraps
+        line = min(max(event.y, 0) // self.row_height * self.lines_per_row, len(self.lengths) - 1) + 1
+        top = int(self.text.index("@0,0").split('.')[0])
+        bottom = int(self.text.index(f"@0,{self.text.winfo_height()}").split('.')[0])
+        self.text.yview(f"{max(line - (bottom - top) // 2, 1)}.0")
+
+
+class UndoHistory:
+    """Undo/redo stacks of (position, deleted, inserted) deltas, kept under a byte budget."""
+
+    coalesce_seconds = 1.0  # typing or deleting faster than this merges into one step
+    entry_overhead = sys.getsizeof([None] * 3) + sys.getsizeof((0, 0))
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.undo_entries = collections.deque()
+        self.redo_entries = []
+        self.size = 0
+        self._paused = 0
+        self._last_record = 0.0
+
+    def _entry_size(self, entry):
+        return self.entry_overhead + sys.getsizeof(entry[1]) + sys.getsizeof(entry[2])
+
+    @staticmethod
+    def _end_of(position, text):
+        # Where the cursor lands after text is inserted at position
+        line, col = position
+        newlines = text.count("\n")
+        if newlines:
+            return line + newlines, len(text) - text.rfind("\n") - 1
+        return line, col + len(text)
+
+    @staticmethod
+    def _common_prefix(a, b, block=65536):
+        # Compare whole blocks first so a 50 MB rewrite is not walked char by char in Python
+        limit = min(len(a), len(b))
+        n = 0
+        while n < limit and a[n:n + block] == b[n:n + block]:
+            n += block
+        n = min(n, limit)
+        while n < limit and a[n] == b[n]:
+            n += 1
+        return n
+
+    @contextlib.contextmanager
+    def paused(self):
+        self._paused += 1
+        try:
+            yield
+        finally:
+            self._paused -= 1
+
+    def recording(self):
+        return not self._paused
+
+    def clear(self):
+        self.undo_entries.clear()
+        self.redo_entries = []
+        self.size = 0
+
+    def set_budget(self, budget):
+        self.budget = budget
+        self._trim()
+
+    def record(self, position, deleted, inserted):
+        # Store only what changed: drop the text the two sides have in common at either end
+        if deleted and inserted:
+            prefix = self._common_prefix(deleted, inserted)
+            suffix = self._common_prefix(deleted[prefix:][::-1], inserted[prefix:][::-1])
+            position = self._end_of(position, deleted[:prefix])
+            deleted, inserted = deleted[prefix:len(deleted) - suffix], inserted[prefix:len(inserted) - suffix]
+        if not deleted and not inserted:
+            return
+        self.size -= sum(self._entry_size(entry) for entry in self.redo_entries)
+        self.redo_entries = []
+
+        now = time.monotonic()
+        previous = self.undo_entries[-1] if self.undo_entries and now - self._last_record < self.coalesce_seconds else None
+        self._last_record = now
+        if previous is not None and self._merge(previous, position, deleted, inserted):
+            return
+        entry = [position, deleted, inserted]
+        self.undo_entries.append(entry)
+        self.size += self._entry_size(entry)
+        self._trim()
+
+    def _merge(self, previous, position, deleted, inserted):
+        old_size = self._entry_size(previous)
+        previous_position, previous_deleted, previous_inserted = previous
+        if "\n" in deleted or "\n" in inserted:
+            return False  # a new line starts a new step
+        if not deleted and previous_inserted and self._end_of(previous_position, previous_inserted) == position:
+            if inserted.isspace() and not previous_inserted[-1].isspace():
+                return False  # break typing runs at word boundaries
+            previous[2] = previous_inserted + inserted
+        elif not deleted and not previous_inserted and previous_position == position:
+            previous[2] = inserted  # typing over a selection
+        elif not inserted and not previous_inserted and self._end_of(position, deleted) == previous_position:
+            previous[0], previous[1] = position, deleted + previous_deleted  # BackSpace run
+        elif not inserted and not previous_inserted and position == previous_position:
+            previous[1] = previous_deleted + deleted  # Delete run
+        else:
+            return False
+        self.size += self._entry_size(previous) - old_size
+        self._trim()
+        return True
+
+    def _trim(self, limit=None):
+        # Drop the oldest undo steps until the history fits its budget
+        limit = self.budget if limit is None else limit
+        while self.size > limit and self.undo_entries:
+            self.size -= self._entry_size(self.undo_entries.popleft())
+        if self.size > limit:
+            self.clear()
+
+    def shrink(self, fraction):
+        # Called under memory pressure: keep only the newest part of the history
+        self._trim(int(self.size * fraction))
+
+    def undo(self):
+        # Returns (position, text to remove, text to put back) or None
+        if not self.undo_entries:
+            return None
+        entry = self.undo_entries.pop()
+        self.redo_entries.append(entry)
+        self._last_record = 0.0  # never merge into a step that was undone
+        position, deleted, inserted = entry
+        return position, inserted, deleted
+
+    def redo(self):
+        if not self.redo_entries:
+            return None
+        entry = self.redo_entries.pop()
+        self.undo_entries.append(entry)
+        self._last_record = 0.0
+        position, deleted, inserted = entry
+        return position, deleted, inserted
+
+    def memory_use(self):
+        return len(self.undo_entries), len(self.redo_entries), self.size
+
+
+class ChangeTracker:
+    """Tracks which buffer lines differ from the last loaded or saved version."""
+
+    max_hunk_lines = 5000  # bigger regions are anchored on unique lines first, see _align_large
+
+    def __init__(self, hash_chars=None):
+        self.hash_chars = hash_chars  # only this much of a line is compared, as protected lines are only read that far
+        self.reset("")
+
+    def _hash(self, line):
+        return hash(line[:self.hash_chars].replace("¦", " "))  # indentation markers are display only
+
+    def reset(self, content):
+        self.baseline = [self._hash(line) for line in content.split("\n")]
+        self.hashes = list(self.baseline)
+        self.origins = list(range(len(self.baseline)))  # baseline line each buffer line came from, None if added
+        self.dirty = [False] * len(self.baseline)  # edited since the last realign()
+
+    def update_lines(self, first_line, old_last_line, new_text):
+        # Same contract as WordIndex.update_lines; old and new lines are paired up by position until realign()
+        new_hashes = [self._hash(line) for line in new_text.split("\n")]
+        old_origins = self.origins[first_line - 1:old_last_line]
+        new_origins = old_origins[:len(new_hashes)] + [None] * (len(new_hashes) - len(old_origins))
+        self.hashes[first_line - 1:old_last_line] = new_hashes
+        self.origins[first_line - 1:old_last_line] = new_origins
+        self.dirty[first_line - 1:old_last_line] = [True] * len(new_hashes)
+
+    def memory_use(self):
+        # Approximate: the four per-line lists plus one hash int per line on each side
+        lists = (self.baseline, self.hashes, self.origins, self.dirty)
+        return sum(map(sys.getsizeof, lists)) + sys.getsizeof(2 ** 62) * (len(self.baseline) + len(self.hashes))
+
+    def _matches(self, i):
+        origin = self.origins[i]
+        return origin is not None and self.hashes[i] == self.baseline[origin]
+
+    def realign(self):
+        # Diff just the hunks that contain edited lines, bounded by the unchanged lines around them
+        start = 0
+        while True:
+            try:
+                i = self.dirty.index(True, start)
+            except ValueError:
+                return
+            if self._matches(i):
+                self.dirty[i] = False
+                start = i + 1
+                continue
+            lo, hi = i, i + 1
+            while lo > 0 and not self._matches(lo - 1):
+                lo -= 1
+            while hi < len(self.hashes) and not self._matches(hi):
+                hi += 1
+            baseline_lo = self.origins[lo - 1] + 1 if lo > 0 else 0
+            baseline_hi = self.origins[hi] if hi < len(self.hashes) else len(self.baseline)
+            if hi - lo <= self.max_hunk_lines and baseline_hi - baseline_lo <= self.max_hunk_lines:
+                self._align(lo, hi, baseline_lo, baseline_hi)
+            else:
+                self._align_large(lo, hi, baseline_lo, baseline_hi)
+            self.dirty[lo:hi] = [False] * (hi - lo)
+            start = hi
+
+    def _align(self, lo, hi, baseline_lo, baseline_hi):
+        matcher = difflib.SequenceMatcher(None, self.baseline[baseline_lo:baseline_hi], self.hashes[lo:hi], autojunk=False)
+        origins = []
+        for tag, b1, b2, c1, c2 in matcher.get_opcodes():
+            if tag in ("equal", "replace"):
+                paired = list(range(baseline_lo + b1, baseline_lo + b2))[:c2 - c1]
+                origins.extend(paired + [None] * (c2 - c1 - len(paired)))
+            elif tag == "insert":
+                origins.extend([None] * (c2 - c1))
+        self.origins[lo:hi] = origins
+
+    def _align_large(self, lo, hi, baseline_lo, baseline_hi):
+        # Too big for one difflib pass, typically a whole-buffer rewrite: anchor on lines that occur exactly
+        # once on each side and in the same order (patience diff), then diff the gaps between the anchors
+        while lo < hi and baseline_lo < baseline_hi and self.hashes[lo] == self.baseline[baseline_lo]:
+            self.origins[lo] = baseline_lo  # unchanged lines at the start need no anchors
+            lo += 1
+            baseline_lo += 1
+        while lo < hi and baseline_lo < baseline_hi and self.hashes[hi - 1] == self.baseline[baseline_hi - 1]:
+            hi -= 1
+            baseline_hi -= 1
+            self.origins[hi] = baseline_hi
+        baseline_position = {}
+        for j in range(baseline_lo, baseline_hi):
+            line_hash = self.baseline[j]
+            baseline_position[line_hash] = None if line_hash in baseline_position else j
+        buffer_counts = collections.Counter(self.hashes[lo:hi])
+        anchors = [(baseline_position[line_hash], i) for i, line_hash in enumerate(self.hashes[lo:hi], lo)
+                   if buffer_counts[line_hash] == 1 and baseline_position.get(line_hash) is not None]
+
+        # longest run of anchors whose baseline positions increase too
+        tails, tail_anchor, previous = [], [], [None] * len(anchors)
+        for k, (j, _) in enumerate(anchors):
+            p = bisect.bisect_left(tails, j)
+            previous[k] = tail_anchor[p - 1] if p else None
+            tails[p:p + 1] = [j]
+            tail_anchor[p:p + 1] = [k]
+        chain, k = [], tail_anchor[-1] if tail_anchor else None
+        while k is not None:
+            chain.append(anchors[k])
+            k = previous[k]
+
+        for j, i in reversed([(baseline_hi, hi)] + chain):
+            if i == lo or j == baseline_lo:
+                self.origins[lo:i] = [None] * (i - lo)  # only added lines, or only deleted ones, in this gap
+            elif i - lo <= self.max_hunk_lines and j - baseline_lo <= self.max_hunk_lines:
+                self._align(lo, i, baseline_lo, j)
+            else:
+                paired = list(range(baseline_lo, j))[:i - lo]  # no anchors to go by: pair up by position
+                self.origins[lo:i] = paired + [None] * (i - lo - len(paired))
+            if i < hi:
+                self.origins[i] = j
+            lo, baseline_lo = i + 1, j + 1
+
+    def _previous_origin(self, i):
+        for j in range(i - 1, -1, -1):
+            if self.origins[j] is not None:
+                return self.origins[j]
+        return -1
+
+    def marker(self, line):
+        # ("added" | "modified" | None, whether saved lines were deleted just above) for a 1-based line
+        i = line - 1
+        if i >= len(self.origins):
+            return None, False
+        origin = self.origins[i]
+        if origin is None:
+            return "added", False
+        state = "modified" if self.hashes[i] != self.baseline[origin] else None
+        return state, origin > self._previous_origin(i) + 1
+
+    def changed_spans(self):
+        # [first line, last line, "added" | "modified"] runs of edited lines, in buffer order
+        spans = []
+        for i, origin in enumerate(self.origins):
+            if origin is None:
+                state = "added"
+            elif self.hashes[i] != self.baseline[origin]:
+                state = "modified"
+            else:
+                continue
+            if spans and spans[-1][1] == i and spans[-1][2] == state:
+                spans[-1][1] = i + 1
+            else:
+                spans.append([i + 1, i + 1, state])
+        return spans
+
+    def change_lines(self):
+        # First line of every changed region, in buffer order
+        starts = []
+        previous_origin, in_change = -1, False
+        for i, origin in enumerate(self.origins):
+            edited = origin is None or self.hashes[i] != self.baseline[origin]
+            deleted_above = origin is not None and origin > previous_origin + 1
+            if (edited and not in_change) or deleted_above:
+                starts.append(i + 1)
+            in_change = edited
+            if origin is not None:
+                previous_origin = origin
+        if previous_origin < len(self.baseline) - 1 and (not starts or starts[-1] != len(self.origins)):
+            starts.append(len(self.origins))  # lines deleted from the end of the file
+        return starts
+
+
+class PeerText(tk.Text):
+    """A text widget created with 'peer create', so it shows another text widget's buffer."""
+
+    def __init__(self, master, peer_of, **kwargs):
+        self.widgetName = "text"
+        self._setup(master, {})
+        peer_of.peer_create(self._w, **kwargs)
+
+
+class SymbolIndexer:
+    """Finds classes and functions in a buffer snapshot in a worker process, so parsing never holds the UI's GIL."""
+
+    # Fallback patterns for files that are not Python; group 1 is the kind, group 2 the name
+    generic_patterns = [
+        re.compile(r'^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?(function)\s*\*?\s*([A-Za-z_$][\w$]*)'),
+        re.compile(r'^\s*(?:(?:public|private|protected|internal|static|abstract|final|sealed|export|partial)\s+)*(class|interface|struct|enum|trait|impl|module|namespace)\s+([A-Za-z_]\w*(?:::\w+)*)'),
+        re.compile(r'^\s*(?:pub(?:\([\w ]+\))?\s+)?(?:async\s+)?(fn|func|def|sub|proc|function)\s+(?:\([^)]*\)\s*)?([A-Za-z_][\w.]*[!?]?)'),
+    ]
+
+    def __init__(self):
+        self.executor = None
+        self.pending = None  # (generation, future) of the newest snapshot
+
+    def submit(self, generation, content, filename=None):
+        # One worker and only the newest snapshot matters: a parse that has not started yet is dropped
+        if self.pending is not None:
+            self.pending[1].cancel()
+        if self.executor is None:
+            # a fresh interpreter rather than a fork of the running Tk process
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        self.pending = (generation, self.executor.submit(SymbolIndexer.parse, content, filename))
+
+    def result(self):
+        # (generation, symbols) once the newest parse is done, None while it is still running
+        if self.pending is None or not self.pending[1].done():
+            return None
+        generation, future = self.pending
+        self.pending = None
+        try:
+            return generation, future.result()
+        except Exception:  # the worker died - show no outline rather than poll forever
+            return generation, []
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = self.pending = None
+
+    @classmethod
+    def parse(cls, content, filename=None):
+        # Returns a list of (line, depth, kind, name) sorted by line
+        if filename is None or filename.endswith((".py", ".pyw")):
+            try:
+                return cls.parse_python(content)
+            except (SyntaxError, ValueError, RecursionError, MemoryError):
+                pass  # half-typed, too deeply nested or not Python at all - use the regex scan
+        return cls.parse_generic(content)
+
+    @staticmethod
+    def parse_python(content):
+        symbols = []
+
+        def visit(node, depth, prefix):
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                    kind = "class" if isinstance(child, ast.ClassDef) else "def"
+                    symbols.append((child.lineno, depth, kind, prefix + child.name))
+                    visit(child, depth + 1, prefix + child.name + ".")
+                elif isinstance(child, ast.stmt):
+                    visit(child, depth, prefix)  # definitions nested in if/try/with blocks
+
+        visit(ast.parse(content), 0, "")
+        symbols.sort()
+        return symbols
+
+    @classmethod
+    def parse_generic(cls, content):
+        symbols = []
+        for line_number, line in enumerate(content.split("\n"), start=1):
+            for pattern in cls.generic_patterns:
+                match = pattern.match(line)
+                if match:
+                    indent = len(line) - len(line.lstrip())
+                    depth = min(len(line[:indent].expandtabs(4)) // 4, 8)
+                    symbols.append((line_number, depth, match.group(1), match.group(2)))
+                    break
+        return symbols
+
+
+class WordIndex:
+    """Counts the identifiers on each buffer line so completions never rescan the whole buffer."""
+
+    word_pattern = re.compile(r'[A-Za-z_][A-Za-z0-9_]{2,}')
+    max_line_length = 10000  # longer lines (minified code, data) are not indexed
+    bulk_lines = 200  # updates touching more lines re-sort the words once instead of inserting them one by one
+
+    def __init__(self):
+        self.line_words = [[]]  # identifiers found on each line, line 1 first
+        self.counts = collections.Counter()  # identifier -> occurrences in the buffer
+        self.sorted_words = []  # keys of counts in sorted order for prefix lookups
+
+    def update_lines(self, first_line, old_last_line, new_text):
+        # Lines first_line..old_last_line were replaced by the lines of new_text
+        new_words = [self.word_pattern.findall(line) if len(line) <= self.max_line_length else []
+                     for line in new_text.split("\n")]
+        old_words = self.line_words[first_line - 1:old_last_line]
+        if len(old_words) + len(new_words) > self.bulk_lines:
+            # loading, closing or rewriting the buffer: count in bulk and sort once
+            self.counts.subtract(itertools.chain.from_iterable(old_words))
+            self.counts.update(itertools.chain.from_iterable(new_words))
+            self.counts = +self.counts  # drop the words that are gone
+            self.sorted_words = sorted(self.counts)
+        else:
+            for words in old_words:
+                for word in words:
+                    self._discard(word)
+            for words in new_words:
+                for word in words:
+                    self._add(word)
+        self.line_words[first_line - 1:old_last_line] = new_words
+
+    def memory_use(self):
+        # Approximate: per-line word lists, the count table and the sorted words themselves
+        return (sys.getsizeof(self.line_words) + sum(map(sys.getsizeof, self.line_words))
+                + sys.getsizeof(self.counts) + sys.getsizeof(self.sorted_words)
+                + sum(map(sys.getsizeof, self.sorted_words)))
+
+    def _add(self, word):
+        count = self.counts.get(word, 0)
+        if not count:
+            bisect.insort(self.sorted_words, word)
+        self.counts[word] = count + 1
+
+    def _discard(self, word):
+        count = self.counts[word] - 1
+        if count:
+            self.counts[word] = count
+        else:
+            del self.counts[word]
+            del self.sorted_words[bisect.bisect_left(self.sorted_words, word)]
+
+    def words_with_prefix(self, prefix, limit=500):
+        start = bisect.bisect_left(self.sorted_words, prefix)
+        matches = []
+        for word in self.sorted_words[start:start + limit]:
+            if not word.startswith(prefix):
+                break
+            matches.append(word)
+        return matches
+
+    def complete(self, prefix, line, others=(), limit=10, nearby_lines=40):
+        # Rank by frequency here, frequency in other files, and use near the cursor
+        scores = {}
+        for word in self.words_with_prefix(prefix):
+            scores[word] = self.counts[word]
+        for other in others:
+            for word in other.words_with_prefix(prefix):
+                scores[word] = scores.get(word, 0) + other.counts[word] * 0.5
+        nearby = set()
+        for words in self.line_words[max(line - 1 - nearby_lines, 0):line + nearby_lines]:
+            nearby.update(words)
+        for word in nearby.intersection(scores):
+            scores[word] += 10
+        if self.counts.get(prefix) == 1:
+            scores.pop(prefix, None)  # only the word being typed
+        return sorted(scores, key=lambda word: (-scores[word], word))[:limit]
+
+
+class SingleInstance:
+    """Hands file arguments to an editor that is already running, over a local Unix socket."""
+
+    def __init__(self, path=None):
+        self.path = path or self.default_path()
+        self.server = None
+
+    @staticmethod
+    def default_path():
+        # inside a private directory, so other local users can neither plant the socket nor listen in its place
+        directory = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+        return os.path.join(directory, f"simple-programmers-editor-{os.getuid()}", "instance.sock")
+
+    def _check_path(self):
+        # Raise unless the socket's directory belongs to us alone and anything at the path is our own socket
+        directory = os.path.dirname(self.path)
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
+        info = os.lstat(directory)
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+            raise PermissionError(errno.EPERM, "not a private directory", directory)
+        try:
+            info = os.lstat(self.path)
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid():
+            raise PermissionError(errno.EPERM, "not a socket of ours", self.path)
+
+    @staticmethod
+    def supported():
+        return hasattr(socket, "AF_UNIX") and hasattr(os, "getuid")
+
+    def send(self, files, readonly=False):
+        # Returns True if a running editor took the files, False if we should start normally
+        try:
+            self._check_path()
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.settimeout(0.5)
+                client.connect(self.path)
+                client.sendall(json.dumps({"files": files, "readonly": readonly}).encode("utf-8"))
+                client.shutdown(socket.SHUT_WR)
+                return client.recv(2) == b"ok"
+        except OSError:
+            return False  # nobody listening, a stale or foreign socket file, or a running editor too busy to answer in time
+
+    def _remove_stale_socket(self):
+        # Only a socket file nobody listens on may be replaced; a busy editor merely missed send()'s timeout
+        self._check_path()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            probe.settimeout(0.5)
+            try:
+                probe.connect(self.path)
+            except ConnectionRefusedError:
+                os.unlink(self.path)  # left behind by an editor that is gone
+                return
+            except FileNotFoundError:
+                return
+        raise OSError(errno.EADDRINUSE, "another editor is listening on", self.path)
+
+    def listen(self, widget, callback):
+        # Serve requests from the Tk event loop; callback receives the [path, line, col] list and the read only flag
+        self._remove_stale_socket()
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.path)
+        os.chmod(self.path, 0o600)
+        self.server.listen(8)
+        self.server.setblocking(False)
+
+        def accept(fileobj, mask):
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            # Read the request as it arrives instead of blocking the Tk thread until the client is done
+            connection.setblocking(False)
+            chunks = []
+
+            def finish(complete):
+                widget.after_cancel(give_up)
+                widget.tk.deletefilehandler(connection)
+                with connection:
+                    if not complete:
+                        return
+                    try:
+                        request = json.loads(b"".join(chunks).decode("utf-8"))
+                        files, readonly = request["files"], request.get("readonly", False)
+                        connection.sendall(b"ok")
+                    except (OSError, ValueError, KeyError, TypeError):
+                        return
+                callback(files, readonly)
+
+            def receive(fileobj, mask):
+                try:
+                    chunk = connection.recv(65536)
+                except BlockingIOError:
+                    return
+                except OSError:
+                    finish(False)
+                    return
+                if chunk:
+                    chunks.append(chunk)
+                else:
+                    finish(True)
+
+            give_up = widget.after(5000, finish, False)
+            widget.tk.createfilehandler(connection, tk.READABLE, receive)
+
+        widget.tk.createfilehandler(self.server, tk.READABLE, accept)
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+# Text transforms shared by the editor and the headless batch mode ---------------
+# Each takes the buffer content and returns (new content, number of changes).
+
+def replace_all(content, find, replacement):
+    if not find:
+        return content, 0
+    return content.replace(find, replacement), content.count(find)
+
+
+def trim_trailing_whitespace(content):
+    return re.subn(r'[ \t]+(?=\r?\n|\r?\Z)', '', content)
+
+
+def convert_indentation(content, tab_spaces, use_spaces):
+    count = 0
+
+    def convert(match):
+        nonlocal count
+        width = len(match.group(0).expandtabs(tab_spaces))
+        if use_spaces:
+            converted = ' ' * width
+        else:
+            converted = '\t' * (width // tab_spaces) + ' ' * (width % tab_spaces)
+        count += converted != match.group(0)
+        return converted
+
+    return re.sub(r'^[ \t]+', convert, content, flags=re.MULTILINE), count
+
+
+def mark_indentation(content, tab_spaces):
+    # Every run of tab_spaces spaces ends in a visible '¦' while indentation is displayed
+    return re.sub(' ' * tab_spaces, ' ' * (tab_spaces - 1) + '¦', content)
+
+
+def unmark_indentation(content):
+    return content.replace('¦', ' ')
+
+
+def transform_file(filepath, steps, dry_run=False):
+    # Worker for the batch mode: runs in a pool process, so no Tk here
+    try:
+        with open(filepath, "r", newline="") as file:
+            original = file.read()
+        content, changes = original, 0
+        for transform, args in steps:
+            content, count = transform(content, *args)
+            changes += count
+        if content != original and not dry_run:
+            with open(filepath, "w", newline="") as file:
+                file.write(content)
+        return filepath, content != original, changes, None
+    except (OSError, UnicodeDecodeError) as e:
+        return filepath, False, 0, str(e)
+
+
+def run_batch(args):
+    config = ConfigManager().read_config() or {}
+    tab_spaces = args.tab_spaces or config.get('tab_spaces', 4)
+    steps = []
+    if args.find is not None:
+        steps.append((replace_all, (args.find, args.replace or "")))
+    if args.indent:
+        steps.append((convert_indentation, (tab_spaces, args.indent == "spaces")))
+    if args.trim_trailing:
+        steps.append((trim_trailing_whitespace, ()))
+    if not steps:
+        print("--batch needs at least one of --find, --indent or --trim-trailing", file=sys.stderr)
+        return 2
+
+    failures = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(transform_file, filepath, steps, args.dry_run) for filepath in args.files]
+        for future in concurrent.futures.as_completed(futures):
+            filepath, changed, changes, error = future.result()
+            if error:
+                failures += 1
+                print(f"{'error':<9} {filepath}: {error}", flush=True)
+            else:
+                print(f"{'changed' if changed else 'unchanged':<9} {filepath} ({changes} changes)", flush=True)
+    return 1 if failures else 0
+
+
+def parse_file_argument(argument):
+    # "path/to/file.py:42:7" -> [absolute path, 42, 7]; line and column are optional
+    match = re.match(r'^(.*?)(?::(\d+))?(?::(\d+))?$', argument)
+    filepath, line, col = match.group(1), match.group(2), match.group(3)
+    return [os.path.abspath(filepath), int(line) if line else None, int(col) if col else None]
+
+
+def positive_int(value):
+    # argparse type for counts that must be at least 1
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    return number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simple Programmers Editor")
+    parser.add_argument("files", nargs="*", metavar="file[:line[:col]]", help="files to open")
+    parser.add_argument("--readonly", action="store_true", help="open the files read only")
+    wrap_group = parser.add_mutually_exclusive_group()
+    wrap_group.add_argument("--wrap", dest="wrap", action="store_true", default=None, help="turn word wrap on")
+    wrap_group.add_argument("--nowrap", dest="wrap", action="store_false", help="turn word wrap off")
+    parser.add_argument("--new-instance", action="store_true", help="always start a new editor instead of reusing a running one")
+    parser.add_argument("--trace-memory", action="store_true", help="start tracemalloc so the memory report can show allocations")
+
+    batch_group = parser.add_argument_group("batch mode", "transform the files without opening a window")
+    batch_group.add_argument("--batch", action="store_true", help="run the transforms below over every file and exit")
+    batch_group.add_argument("--find", help="text to replace")
+    batch_group.add_argument("--replace", help="replacement for --find (default: delete it)")
+    batch_group.add_argument("--indent", choices=("spaces", "tabs"), help="convert leading indentation")
+    batch_group.add_argument("--tab-spaces", type=positive_int, help="spaces per tab (default: from config.json)")
+    batch_group.add_argument("--trim-trailing", action="store_true", help="remove trailing whitespace")
+    batch_group.add_argument("--jobs", type=positive_int, help="worker processes (default: one per CPU)")
+    batch_group.add_argument("--dry-run", action="store_true", help="report changes without writing files")
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        return run_batch(args)
+    batch_only = {"--find": args.find is not None, "--replace": args.replace is not None, "--indent": args.indent,
+                  "--tab-spaces": args.tab_spaces, "--trim-trailing": args.trim_trailing, "--jobs": args.jobs,
+                  "--dry-run": args.dry_run}
+    given = [flag for flag, value in batch_only.items() if value]
+    if given:
+        parser.error(f"{', '.join(given)} can only be used with --batch")
+
+    files = [parse_file_argument(argument) for argument in args.files]
+
+    instance = SingleInstance() if SingleInstance.supported() and not args.new_instance else None
+    if instance is not None and instance.send(files, args.readonly):
+        return 0  # the running editor has them
+
+    if args.trace_memory:
+        tracemalloc.start()
     root = tk.Tk()
     editor = TextWithLineNumbers(root)
     editor.create_menus()
     editor.pack(fill=tk.BOTH, expand=True)
+    if args.wrap is not None:
+        editor.word_wrap.set(args.wrap)
     editor.toggle_word_wrap()
-    root.mainloop()
+    if args.readonly:
+        editor.readonly_var.set(True)
+        editor.toggle_readonly()
+    if files:
+        editor.open_requested_files(files, args.readonly)
+    if instance is not None:
+        try:
+            instance.listen(root, editor.open_requested_files)
+        except OSError:
+            instance = None  # carry on as a plain standalone editor
+    try:
+        root.mainloop()
+    finally:
+        if instance is not None:
+            instance.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
 
 